@@ -0,0 +1,507 @@
+import random
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from games.models import Game, Block
+from games.storage import pack_board, unpack_board, packed_block_id
+
+# Global constants
+from games.constants import BOARD_WIDTH, BOARD_HEIGHT
+
+# (row, column) steps to the neighbours of a block: top, bottom, left and right, then the four corners
+NEIGHBOUR_STEPS = ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+
+
+def as_array(values):
+    """
+    This method views one byte per block as a numpy array without copying it, so writes go to the board itself
+    :param values: one byte per block - bytearray (or bytes, read only)
+    :return: numpy array of uint8
+    """
+    return np.frombuffer(values, dtype=np.uint8)
+
+
+def convolve_mines(mines, width, height):
+    """
+    This method counts the nearby mines of every block in one pass (a 3x3 box sum over the mine grid)
+    :param mines: one byte per block, 1 for a mine
+    :param width: number of columns
+    :param height: number of rows
+    :return: nearby mines of every block - bytearray
+    """
+    # Pad the grid with empty blocks so every block has all eight neighbours
+    grid = as_array(mines).reshape(height, width)
+    padded = np.pad(grid, 1)
+
+    # Sum each block with its left and right neighbours, then those with the rows above and below
+    rows = padded[:, :-2] + padded[:, 1:-1] + padded[:, 2:]
+    total = rows[:-2] + rows[1:-1] + rows[2:]
+
+    # Leave out the block itself
+    return bytearray(total - grid)
+
+
+def zero_area(mines, nearby, width, start):
+    """
+    This method labels the area of blocks with no nearby mines that joins a block through top, bottom, left and right
+    neighbours, growing a whole frontier of indexes per step instead of visiting one block at a time (only the
+    blocks around the area are looked at, so the time grows with the area and not the board)
+    :param mines: one byte per block, 1 for a mine - numpy array
+    :param nearby: nearby mines of every block - numpy array
+    :param width: number of columns
+    :param start: index of a block with no nearby mines that is not a mine, the area grows from it
+    :return: indexes of the blocks in the area - numpy array
+    """
+    size = len(mines)
+
+    # The area is a sparse set over memory that is never cleared (an index is in it if its slot points at it in
+    # members), so nothing the size of the board is written
+    slots = np.empty(size, dtype=np.intp)
+    members = np.empty(size, dtype=np.intp)
+    slots[start], members[0] = 0, start
+    count = 1
+
+    frontier = np.array([start])
+    while frontier.size:
+        # Step to the neighbours that exist, keep the zero ones not yet in the area
+        col = frontier % width
+        grown = np.concatenate((frontier[frontier >= width] - width, frontier[frontier < size - width] + width,
+                                frontier[col > 0] - 1, frontier[col < width - 1] + 1))
+        grown = grown[(mines[grown] == 0) & (nearby[grown] == 0)]
+        slot = slots[grown]
+        known = (slot >= 0) & (slot < count)
+        known[known] = members[slot[known]] == grown[known]
+        grown = grown[~known]
+
+        # Indexes reached twice in a step keep one copy (the last slot written wins), without a sort
+        steps = np.arange(count, count + grown.size)
+        slots[grown] = steps
+        frontier = grown[slots[grown] == steps]
+
+        # Add the new frontier to the area
+        steps = np.arange(count, count + frontier.size)
+        members[steps] = frontier
+        slots[frontier] = steps
+        count += frontier.size
+    return members[:count]
+
+
+def surroundings(area, width, height):
+    """
+    This method finds the blocks in an area or next to it (all eight neighbours), working only on the rows and
+    columns the area spans
+    :param area: indexes of the blocks in the area - numpy array
+    :param width: number of columns
+    :param height: number of rows
+    :return: indexes of the blocks, in order - numpy array
+    """
+    rows, cols = np.divmod(area, width)
+
+    # The box around the area, one block wider on every side that has one
+    top, left = max(rows.min() - 1, 0), max(cols.min() - 1, 0)
+    bottom, right = min(rows.max() + 2, height), min(cols.max() + 2, width)
+    box = np.zeros((bottom - top, right - left), dtype=bool)
+    box[rows - top, cols - left] = True
+
+    # Grow up and down, then left and right (the corners come with the second step)
+    grown = box.copy()
+    grown[1:] |= box[:-1]
+    grown[:-1] |= box[1:]
+    box = grown.copy()
+    grown[:, 1:] |= box[:, :-1]
+    grown[:, :-1] |= box[:, 1:]
+
+    box_rows, box_cols = np.nonzero(grown)
+    return (box_rows + top) * width + box_cols + left
+
+
+class StaleBoardError(Exception):
+    """
+    Raised when a board is saved after another move changed its game since it was loaded
+    """
+
+
+# Game counters kept up to date by the board, see Board.block_counters
+COUNTERS = ('flags_placed', 'mines_flagged', 'safe_hidden')
+
+
+class Board:
+    """
+    This class holds every block of a game in memory so the board can be read and changed without extra queries
+    """
+
+    def __init__(self, game=None, width=BOARD_WIDTH, height=BOARD_HEIGHT, mines=None, flipped=None, flagged=None,
+                 nearby=None):
+        size = width * height
+
+        self.game = game
+        self.width = width
+        self.height = height
+
+        # One byte per block, in index order
+        self.mines = bytearray(mines) if mines is not None else bytearray(size)
+        self.flipped = bytearray(flipped) if flipped is not None else bytearray(size)
+        self.flagged = bytearray(flagged) if flagged is not None else bytearray(size)
+        self.nearby = bytearray(nearby) if nearby is not None else bytearray(size)
+
+        # Primary keys of the Block rows, in index order (packed games have none)
+        self.ids = None
+
+        # Indexes of the blocks changed since the board was loaded
+        self.changed = set()
+
+        # Changes to the game counters since the board was loaded
+        self.deltas = dict.fromkeys(COUNTERS, 0)
+
+        # Were the mines placed since the board was loaded (see place_mines)
+        self.mines_placed = False
+
+        # Version of the game the blocks were read at, which can be newer than the Game obj (see load)
+        self.loaded_version = game.version if game is not None else None
+
+    def __len__(self):
+        return self.width * self.height
+
+    @classmethod
+    def load(cls, game):
+        """
+        This method loads all the blocks of a game with a single query (or none for a packed game)
+        :param game: Game obj
+        :return: Board obj
+        """
+        if game.is_packed:
+            mines, flipped, flagged, nearby = unpack_board(game.board_data, game.width * game.height)
+            return cls(game=game, width=game.width, height=game.height, mines=mines, flipped=flipped,
+                       flagged=flagged, nearby=nearby)
+
+        # The game version comes with the blocks, as a move can commit after the game row was read
+        rows = Block.objects.filter(game=game).values_list('index', 'id', 'is_mine', 'is_flipped', 'is_flagged',
+                                                           'nearby_mines', 'game__version')
+
+        # Take the rows apart into columns and write each one into place by index
+        board = cls(game=game, width=game.width, height=game.height)
+        columns = np.array(list(rows), dtype=np.int64).reshape(-1, 7).T
+        ids = np.zeros(len(board), dtype=np.int64)
+        ids[columns[0]] = columns[1]
+        board.ids = ids.tolist()
+        for values, column in zip((board.mines, board.flipped, board.flagged, board.nearby), columns[2:6]):
+            as_array(values)[columns[0]] = column
+        if columns[6].size:
+            board.loaded_version = int(columns[6][0])
+        return board
+
+    @classmethod
+    def generate(cls, mines=(), width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        """
+        This method builds a new board in memory with its mines placed and nearby mines counted
+        :param mines: indexes of the mine blocks
+        :param width: number of columns
+        :param height: number of rows
+        :return: Board obj
+        """
+        board = cls(width=width, height=height)
+        as_array(board.mines)[list(mines)] = 1
+        board.nearby = convolve_mines(board.mines, width, height)
+        return board
+
+    def insert(self):
+        """
+        This method writes every block of a new board with a single bulk insert (or a single row write if packed)
+        :return: void
+        """
+        if self.game.is_packed:
+            self.write_packed()
+            return
+
+        Block.objects.bulk_create([
+            Block(game=self.game, index=index, is_mine=bool(self.mines[index]), is_flipped=bool(self.flipped[index]),
+                  is_flagged=bool(self.flagged[index]), nearby_mines=self.nearby[index])
+            for index in range(len(self))
+        ])
+        self.changed.clear()
+
+    def save(self, update_fields=()):
+        """
+        This method writes the changed blocks back, one UPDATE per distinct (flipped, flagged) state, after writing
+        the game (only if its version is still the one the board was loaded with)
+        :param update_fields: names of other Game fields to write with the same UPDATE (such as has_won)
+        :return: void
+        """
+        if not self.changed and not update_fields:
+            return
+
+        # Add the counter changes, the given fields and a new version to the game with a single atomic UPDATE
+        fields = {name: F(name) + delta for name, delta in self.deltas.items() if delta}
+        fields.update((name, getattr(self.game, name)) for name in update_fields)
+        fields['version'] = F('version') + 1
+        fields['updated_at'] = self.game.updated_at = timezone.now()
+        if self.mines_placed:
+            fields['mines_placed'] = True
+
+        # Packed boards go in the same write as the counters
+        if self.game.is_packed:
+            self.game.board_data = fields['board_data'] = pack_board(self)
+
+        if not Game.objects.filter(pk=self.game.pk, version=self.game.version).update(**fields):
+            raise StaleBoardError('Game ' + str(self.game.pk) + ' changed since its board was loaded')
+        self.game.version += 1
+        self.deltas = dict.fromkeys(COUNTERS, 0)
+
+        if not self.game.is_packed:
+            # Newly placed mines with a single UPDATE, then one UPDATE per nearby mines count (at most 8)
+            if self.mines_placed:
+                mines = np.flatnonzero(as_array(self.mines)).tolist()
+                Block.objects.filter(game=self.game, index__in=mines).update(is_mine=True)
+
+                nearby = as_array(self.nearby)
+                for nearby_mines in np.unique(nearby[nearby > 0]).tolist():
+                    indexes = np.flatnonzero(nearby == nearby_mines).tolist()
+                    Block.objects.filter(game=self.game, index__in=indexes).update(nearby_mines=nearby_mines)
+
+            groups = {}
+            for index in self.changed:
+                groups.setdefault((self.flipped[index], self.flagged[index]), []).append(index)
+
+            for (is_flipped, is_flagged), indexes in groups.items():
+                Block.objects.filter(game=self.game, index__in=indexes).update(is_flipped=bool(is_flipped),
+                                                                               is_flagged=bool(is_flagged))
+        self.mines_placed = False
+        self.changed.clear()
+
+    def write_packed(self):
+        """
+        This method writes the whole board into its game row
+        :return: void
+        """
+        self.game.board_data = pack_board(self)
+        Game.objects.filter(pk=self.game.pk).update(board_data=self.game.board_data)
+        self.changed.clear()
+
+    def values(self):
+        """
+        This method lists the blocks the way Block.objects.values() would (with mapped ids for a packed game)
+        :return: list of dicts
+        """
+        ids = self.ids or [packed_block_id(self.game.pk, index) for index in range(len(self))]
+        mines, flipped, flagged = (as_array(values).astype(bool).tolist()
+                                   for values in (self.mines, self.flipped, self.flagged))
+        return [{
+            'id': ids[index],
+            'index': index,
+            'is_mine': mines[index],
+            'is_flipped': flipped[index],
+            'is_flagged': flagged[index],
+            'nearby_mines': self.nearby[index],
+            'game': self.game.pk,
+        } for index in range(len(self))]
+
+    def neighbours(self, index):
+        """
+        This method lists all eight neighbours that exist
+        :param index: index of the block
+        :return: list of indexes
+        """
+        row, col = divmod(index, self.width)
+        return [(row + row_step) * self.width + col + col_step for row_step, col_step in NEIGHBOUR_STEPS
+                if 0 <= row + row_step < self.height and 0 <= col + col_step < self.width]
+
+    def check_no_mines(self, index):
+        """
+        This method checks that a block is not a mine and has no nearby mines
+        :param index: index of the block
+        :return: true if no mines are near, false otherwise
+        """
+        return not self.mines[index] and self.nearby[index] == 0
+
+    def place_mines(self, count, safe_index):
+        """
+        This method places the mines of a game on its first flip, away from the flipped block and its neighbours
+        (only away from the block itself if the board is too crowded), counting nearby mines as each one is placed
+        :param count: number of mines
+        :param safe_index: index of the flipped block
+        :return: void
+        """
+        safe = {safe_index}
+        if len(self) - 9 >= count:
+            safe.update(self.neighbours(safe_index))
+
+        # Sample enough blocks to still have count of them once the safe ones are left out
+        before = self.counters()
+        mines = [index for index in random.sample(range(len(self)), count + len(safe)) if index not in safe][:count]
+        as_array(self.mines)[mines] = 1
+        self.nearby = convolve_mines(self.mines, self.width, self.height)
+
+        # Hidden blocks that became mines are no longer safe, flags on them now count
+        self.add_to_counters({name: value - before[name] for name, value in self.counters().items()})
+        if self.game is not None:
+            self.game.mines_placed = True
+        self.mines_placed = True
+
+    def block_counters(self, index):
+        """
+        This method lists what a block adds to each game counter
+        :param index: index of the block
+        :return: (flags placed, mines flagged, safe hidden) - tuple of 0 or 1
+        """
+        hidden = not self.flipped[index]
+        flag = hidden and self.flagged[index]
+        return int(flag), int(flag and self.mines[index]), int(hidden and not self.mines[index])
+
+    def counters(self):
+        """
+        This method counts the game counters over the whole board (only needed when a board is created)
+        :return: dict of counter values
+        """
+        # Reduce whole arrays rather than going block by block
+        mines, flipped, flagged = (as_array(values).astype(bool) for values in (self.mines, self.flipped, self.flagged))
+        flags = flagged & ~flipped
+        return {
+            'flags_placed': int(np.count_nonzero(flags)),
+            'mines_flagged': int(np.count_nonzero(flags & mines)),
+            'safe_hidden': int(np.count_nonzero(~flipped & ~mines)),
+        }
+
+    def add_to_counters(self, changes):
+        """
+        This method adds changes to the game counters, for the next save and to the game in memory
+        :param changes: dict of counter names to changes
+        :return: void
+        """
+        for name, change in changes.items():
+            if change:
+                self.deltas[name] += change
+                if self.game is not None:
+                    setattr(self.game, name, getattr(self.game, name) + change)
+
+    def set_block(self, index, is_flipped, is_flagged):
+        """
+        This method changes a block and keeps track of the counter changes (the game counters stay current in memory)
+        :param index: index of the block
+        :param is_flipped: new flipped state
+        :param is_flagged: new flagged state
+        :return: void
+        """
+        before = self.block_counters(index)
+        self.flipped[index] = is_flipped
+        self.flagged[index] = is_flagged
+        self.add_to_counters({name: new - old for name, old, new in zip(COUNTERS, before, self.block_counters(index))})
+        self.changed.add(index)
+
+    def update(self, index, is_flipped=None, is_flagged=None):
+        """
+        This method applies a player's change to a block
+        :param index: index of the block
+        :param is_flipped: new flipped state (unchanged if None)
+        :param is_flagged: new flagged state (unchanged if None)
+        :return: void
+        """
+        if is_flipped is None:
+            is_flipped = self.flipped[index]
+        if is_flagged is None:
+            is_flagged = self.flagged[index]
+        self.set_block(index, is_flipped, is_flagged)
+
+    def flip(self, index):
+        """
+        This method flips a block and remembers it for the next save
+        :param index: index of the block
+        :return: true if the block was not flipped before, false otherwise
+        """
+        if self.flipped[index]:
+            return False
+        self.set_block(index, 1, self.flagged[index])
+        return True
+
+    def flip_all(self, indexes):
+        """
+        This method flips many hidden blocks at once, counting their counter changes over the arrays
+        :param indexes: indexes of blocks that are not flipped - numpy array
+        :return: void
+        """
+        mines, flagged = as_array(self.mines)[indexes], as_array(self.flagged)[indexes]
+        as_array(self.flipped)[indexes] = 1
+
+        # Flags on the blocks stop counting and none of them stay hidden
+        self.add_to_counters({
+            'flags_placed': -int(np.count_nonzero(flagged)),
+            'mines_flagged': -int(np.count_nonzero(flagged & mines)),
+            'safe_hidden': -int(np.count_nonzero(mines == 0)),
+        })
+        self.changed.update(indexes.tolist())
+
+
+def build_board(mines=(), flipped=(), flagged=(), width=BOARD_WIDTH, height=BOARD_HEIGHT):
+    """
+    This method builds a board in memory in any state, with its nearby mines counted
+    :param mines: indexes of the mine blocks
+    :param flipped: indexes of the blocks that start flipped
+    :param flagged: indexes of the blocks that start flagged
+    :param width: number of columns
+    :param height: number of rows
+    :return: Board obj
+    """
+    board = Board.generate(mines, width, height)
+    for index in flipped:
+        board.flipped[index] = 1
+    for index in flagged:
+        board.flagged[index] = 1
+    return board
+
+
+def create_games(boards, load_ids=False, **kwargs):
+    """
+    This method creates a game for each board in one transaction: an INSERT per game, then a single bulk insert of
+    the blocks of every game (packed games keep their board in their own row)
+    :param boards: Board objs in the state the games start in
+    :param load_ids: read the block ids back into the boards, with one query for all the games
+    :param kwargs: extra Game fields, the same for every game
+    :return: list of Game objs, each with its board as game.initial_board
+    """
+    games = []
+    with transaction.atomic():
+        for board in boards:
+            # Given fields win over the counted ones (a game with mines placed on its first flip gives its mine_count)
+            fields = dict(mine_count=sum(board.mines), **board.counters())
+            fields.update(kwargs)
+
+            game = Game(width=board.width, height=board.height, **fields)
+            game.initial_board = board
+            game.defer_blocks = True
+            if game.is_packed:
+                game.board_data = pack_board(board)
+            game.save()
+            board.game = game
+            games.append(game)
+
+        row_boards = [board for board in boards if not board.game.is_packed]
+        Block.objects.bulk_create([
+            Block(game=board.game, index=index, is_mine=bool(board.mines[index]),
+                  is_flipped=bool(board.flipped[index]), is_flagged=bool(board.flagged[index]),
+                  nearby_mines=board.nearby[index])
+            for board in row_boards for index in range(len(board))
+        ])
+
+    if load_ids and row_boards:
+        by_game = {board.game.pk: board for board in row_boards}
+        for board in row_boards:
+            board.ids = [0] * len(board)
+        for game_id, index, pk in Block.objects.filter(game__in=list(by_game)).values_list('game', 'index', 'id'):
+            by_game[game_id].ids[index] = pk
+    return games
+
+
+def create_game(mines=(), flipped=(), flagged=(), width=BOARD_WIDTH, height=BOARD_HEIGHT, **kwargs):
+    """
+    This method creates a game and all of its blocks in one transaction (or one row if is_packed is given)
+    :param mines: indexes of the mine blocks
+    :param flipped: indexes of the blocks that start flipped
+    :param flagged: indexes of the blocks that start flagged
+    :param width: number of columns
+    :param height: number of rows
+    :param kwargs: extra Game fields
+    :return: Game obj
+    """
+    return create_games([build_board(mines, flipped, flagged, width, height)], **kwargs)[0]
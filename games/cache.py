@@ -0,0 +1,105 @@
+from django.conf import settings
+from django.core.cache import caches
+
+from games.metrics import metrics
+
+# Global constants
+from games.constants import MAX_ROW_BOARD_BLOCKS
+
+
+def game_etag(game):
+    """
+    This method builds a strong ETag for the current version of a game
+    :param game: Game obj
+    :return: quoted ETag - str
+    """
+    created = int(game.created_at.timestamp() * 1000000)
+    return '"' + str(game.pk) + '-' + str(created) + '-' + str(game.version) + '"'
+
+
+class GameStateCache:
+    """
+    This class caches the serialized state of games, keyed by game id and version (a write through cache)
+    """
+
+    def __init__(self, alias):
+        self.alias = alias      # Name of the Django cache in settings.CACHES
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def key(game, version=None):
+        """
+        This method builds the cache key of a game version (with the creation time, so reused pks never collide)
+        :param game: Game obj
+        :param version: version of the game, the current one if None
+        :return: cache key - str
+        """
+        created = int(game.created_at.timestamp() * 1000000)
+        version = game.version if version is None else version
+        return 'game-state:' + str(game.pk) + ':' + str(created) + ':' + str(version)
+
+    @staticmethod
+    def cacheable(game):
+        """
+        This method checks if the state of a game is small enough to cache (large boards would fill the cache with a
+        few games, and be pickled again on every move)
+        :param game: Game obj
+        :return: boolean
+        """
+        return game.width * game.height <= MAX_ROW_BOARD_BLOCKS
+
+    def get(self, game):
+        """
+        This method finds the cached state of the current version of a game
+        :param game: Game obj
+        :return: game state - dict, or None on a miss (always for large boards)
+        """
+        if not self.cacheable(game):
+            return None
+        data = self.backend.get(self.key(game))
+        metrics.increment('games_state_cache_misses_total' if data is None else 'games_state_cache_hits_total')
+        return data
+
+    def set(self, game, data):
+        """
+        This method caches the state of the current version of a game and drops the previous version
+        :param game: Game obj
+        :param data: game state - dict
+        :return: void
+        """
+        if not self.cacheable(game):
+            return
+        if game.version > 0:
+            self.backend.delete(self.key(game, game.version - 1))
+        self.backend.set(self.key(game), data)
+
+    def invalidate(self, game):
+        """
+        This method drops the cached states of the current and previous version of a game
+        :param game: Game obj
+        :return: void
+        """
+        keys = [self.key(game)]
+        if game.version > 0:
+            keys.append(self.key(game, game.version - 1))
+        self.backend.delete_many(keys)
+
+    def stats(self):
+        """
+        This method reports the cache hits and misses
+        :return: dict
+        """
+        hits = metrics.value('games_state_cache_hits_total')
+        misses = metrics.value('games_state_cache_misses_total')
+        return {
+            'backend': settings.CACHES[self.alias]['BACKEND'],
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+
+state_cache = GameStateCache(settings.GAMES_STATE_CACHE)
@@ -0,0 +1,135 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.utils.module_loading import import_string
+
+
+class LocalRedis:
+    """
+    In process stand-in for a Redis server, with only the commands RedisCache uses and allkeys-lru eviction
+    """
+    servers = {}                # One shared server per url, like a real Redis
+    servers_lock = threading.Lock()
+
+    def __init__(self, max_keys=None):
+        self.lock = threading.Lock()
+        self.max_keys = max_keys
+        self.data = OrderedDict()   # key -> (value, expiry time or None), least recently used first
+
+    @classmethod
+    def from_url(cls, url, max_keys=None):
+        with cls.servers_lock:
+            if url not in cls.servers:
+                cls.servers[url] = cls(max_keys=max_keys)
+            return cls.servers[url]
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return None
+            if item[1] is not None and item[1] <= time.time():
+                del self.data[key]
+                return None
+            self.data.move_to_end(key)
+            return item[0]
+
+    def set(self, key, value, ex=None, nx=False):
+        with self.lock:
+            if nx and key in self.data and (self.data[key][1] is None or self.data[key][1] > time.time()):
+                return None
+            self.data[key] = (value, time.time() + ex if ex is not None else None)
+            self.data.move_to_end(key)
+            while self.max_keys is not None and len(self.data) > self.max_keys:
+                self.data.popitem(last=False)
+            return True
+
+    def expire(self, key, seconds):
+        with self.lock:
+            if key not in self.data:
+                return False
+            self.data[key] = (self.data[key][0], time.time() + seconds)
+            return True
+
+    def persist(self, key):
+        with self.lock:
+            if key not in self.data:
+                return False
+            self.data[key] = (self.data[key][0], None)
+            return True
+
+    def delete(self, *keys):
+        with self.lock:
+            return sum(1 for key in keys if self.data.pop(key, None) is not None)
+
+    def flushdb(self):
+        with self.lock:
+            self.data.clear()
+            return True
+
+
+class RedisCache(BaseCache):
+    """
+    Django cache backend for any client with the redis-py API (redis.Redis, or LocalRedis as a stand-in)
+
+    OPTIONS: CLIENT_CLASS is the dotted path of the client (redis.Redis by default), CLIENT_KWARGS are passed to
+    its from_url with LOCATION as the url.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        client_class = import_string(options.get('CLIENT_CLASS', 'redis.Redis'))
+        self.client = client_class.from_url(server, **options.get('CLIENT_KWARGS', {}))
+
+    def expiry(self, timeout):
+        """
+        This method turns a cache timeout into the seconds Redis expects
+        :param timeout: seconds, DEFAULT_TIMEOUT or None for no expiry
+        :return: seconds - int or None
+        """
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return None if timeout is None else max(int(timeout), 0)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return bool(self.client.set(key, pickle.dumps(value), ex=self.expiry(timeout), nx=True))
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        value = self.client.get(key)
+        return default if value is None else pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        expiry = self.expiry(timeout)
+        if expiry == 0:
+            self.client.delete(key)
+        else:
+            self.client.set(key, pickle.dumps(value), ex=expiry)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        expiry = self.expiry(timeout)
+        return bool(self.client.persist(key) if expiry is None else self.client.expire(key, expiry))
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self.client.delete(key)
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self):
+        self.client.flushdb()
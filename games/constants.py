@@ -1,3 +1,43 @@
 # Export these constants as global
-NUMBER_OF_BLOCKS = 100
+BOARD_WIDTH = 10
+BOARD_HEIGHT = 10
+NUMBER_OF_BLOCKS = BOARD_WIDTH * BOARD_HEIGHT
 NUMBER_OF_MINES = 15
+
+# Largest board a game can ask for
+MAX_BOARD_WIDTH = 1000
+MAX_BOARD_HEIGHT = 1000
+
+# Boards with more blocks than this are always packed into their game row, and sent with one character per block
+# (moves on them answer with only the changes unless asked otherwise)
+MAX_ROW_BOARD_BLOCKS = 10000
+
+# Preset (width, height, mines) for each difficulty
+DIFFICULTIES = {
+    'beginner': (9, 9, 10),
+    'intermediate': (16, 16, 40),
+    'expert': (30, 16, 99),
+}
+
+# Block changes made by each action of a batch of moves
+MOVE_ACTIONS = {
+    'flip': {'is_flipped': True},
+    'flag': {'is_flagged': True},
+    'unflag': {'is_flagged': False},
+}
+
+# Most moves accepted in a single batch
+MAX_BATCH_MOVES = 1000
+
+# Times a move is tried when other moves on the same game get in the way, and the longest first wait between
+# tries in seconds (doubled after each try)
+MOVE_ATTEMPTS = 10
+MOVE_RETRY_DELAY = 0.005
+
+# Database errors a move is tried again on: PostgreSQL serialization failure, deadlock and lock not available, and
+# MySQL lock wait timeout and deadlock (SQLite reports a locked or busy database by message)
+CONTENTION_PGCODES = ('40001', '40P01', '55P03')
+CONTENTION_MYSQL_CODES = (1205, 1213)
+
+# Most fixture games created by a single request to the automation test endpoints
+MAX_FIXTURE_GAMES = 500
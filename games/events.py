@@ -0,0 +1,116 @@
+import json
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class LocalBroker:
+    """
+    This class is an in process publish / subscribe broker for game events, each subscriber has its own queue
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {}       # game id -> set of queues
+
+    def subscribe(self, game_id):
+        """
+        This method starts receiving the events of a game
+        :param game_id: Primary key of the Game obj
+        :return: queue the events are put in
+        """
+        subscription = queue.Queue()
+        with self.lock:
+            self.subscribers.setdefault(game_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, game_id, subscription):
+        """
+        This method stops receiving the events of a game
+        :param game_id: Primary key of the Game obj
+        :param subscription: queue given by subscribe
+        :return: void
+        """
+        with self.lock:
+            subscriptions = self.subscribers.get(game_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self.subscribers.pop(game_id, None)
+
+    def publish(self, game_id, event):
+        """
+        This method sends an event to every subscriber of a game
+        :param game_id: Primary key of the Game obj
+        :param event: dict
+        :return: number of subscribers reached
+        """
+        with self.lock:
+            subscriptions = list(self.subscribers.get(game_id, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+        return len(subscriptions)
+
+
+broker = import_string(settings.GAMES_EVENT_BROKER)()
+
+
+def publish_move(game, delta):
+    """
+    This method pushes the changes of a move to the game's event streams
+    :param game: Game obj after the move
+    :param delta: changes of the move, from serialize_delta
+    :return: void
+    """
+    broker.publish(game.pk, dict(delta, version=game.version))
+
+
+def format_event(name, data, event_id):
+    """
+    This method writes one Server-Sent Event
+    :return: bytes
+    """
+    return ('id: ' + str(event_id) + '\nevent: ' + name + '\ndata: ' + json.dumps(data) + '\n\n').encode()
+
+
+class EventStream:
+    """
+    This class streams the state of a game, then every later move until the game is over or GAMES_EVENT_MAX_AGE
+    passed, as Server-Sent Events. The subscription is dropped when the response is closed, even if the stream was
+    never read
+    """
+
+    def __init__(self, game, state, subscription):
+        self.game = game
+        self.state = state                  # Full game state, read after subscribing so no move is missed
+        self.subscription = subscription    # Queue of the game's events
+        self.broker = broker
+
+    def __iter__(self):
+        yield format_event('state', self.state, self.game.version)
+        if self.state['has_won'] or self.state['has_lost']:
+            return
+
+        deadline = time.monotonic() + settings.GAMES_EVENT_MAX_AGE
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event = self.subscription.get(timeout=min(settings.GAMES_EVENT_KEEPALIVE, remaining))
+            except queue.Empty:
+                # Comments keep proxies from closing an idle stream
+                yield b': keepalive\n\n'
+                continue
+
+            # Moves already in the state are skipped
+            if event['version'] <= self.game.version:
+                continue
+            yield format_event('move', event, event['version'])
+            if event['has_won'] or event['has_lost']:
+                return
+
+    def close(self):
+        self.broker.unsubscribe(self.game.pk, self.subscription)
@@ -0,0 +1,43 @@
+import random
+
+from games.board import build_board, create_games
+
+# Global constants
+from games.constants import NUMBER_OF_BLOCKS, NUMBER_OF_MINES
+
+
+def winner_board():
+    # NUMBER_OF_MINES flagged mines on the board
+    mines = random.sample(range(1, NUMBER_OF_BLOCKS), NUMBER_OF_MINES)
+    return build_board(mines=mines, flagged=mines)
+
+
+def loser_board():
+    # NUMBER_OF_MINES flipped mines on the board (block 99 is left unflipped for a hard coded test)
+    mines = random.sample(range(1, NUMBER_OF_BLOCKS), NUMBER_OF_MINES)
+    return build_board(mines=mines, flipped=[mine for mine in mines if mine != 99])
+
+
+def big_sweep_board():
+    # A mine in the bottom right corner, flipping the top left block opens every other block
+    return build_board(mines=[NUMBER_OF_BLOCKS - 1])
+
+
+# Board builder and game result of each automation test fixture
+FIXTURES = {
+    'winner': (winner_board, {'has_won': True}),
+    'loser': (loser_board, {'has_lost': True}),
+    'big_sweep': (big_sweep_board, {}),
+}
+
+
+def create_fixture_games(name, count=1):
+    """
+    This method creates test games already in the final state of a fixture, with an INSERT per game and a single
+    bulk insert of all their blocks
+    :param name: winner, loser or big_sweep
+    :param count: number of games
+    :return: list of Game objs, with their boards (block ids included) as game.initial_board
+    """
+    build, fields = FIXTURES[name]
+    return create_games([build() for _ in range(count)], load_ids=True, is_test=True, **fields)
@@ -0,0 +1,191 @@
+import json
+import os
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from games.board import create_game
+from games.cache import state_cache
+from games.models import Game, Block
+
+# Results compared with the baseline: latency percentiles may grow by the threshold, queries may not grow at all
+COMPARED = (('p50_ms', True), ('p99_ms', True), ('peak_kb', True), ('queries', False))
+
+
+def percentile(values, fraction):
+    """
+    This method picks the nearest rank percentile of a list of values
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = ('Time the main games requests end to end (latency percentiles, SQL queries and peak memory) and compare '
+            'them with a stored baseline, failing on regressions')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per scenario')
+        parser.add_argument('--baseline', default=os.path.join(settings.BASE_DIR, 'benchmarks', 'games.json'),
+                            help='JSON file of the results to compare with')
+        parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline')
+        parser.add_argument('--threshold', type=float, default=0.5,
+                            help='Fraction a latency or memory result may grow over the baseline before failing')
+        parser.add_argument('--scenarios', nargs='+', help='Only run these scenarios')
+
+    def handle(self, *args, **options):
+        self.client = Client()
+        scenarios = self.scenarios()
+        names = options['scenarios'] or list(scenarios)
+        unknown = set(names) - set(scenarios)
+        if unknown:
+            raise CommandError('Unknown scenarios: ' + ', '.join(sorted(unknown)))
+
+        # Keep the board pool out of the way, every new game is made by the request being timed (the test client
+        # calls itself testserver)
+        results = {}
+        with override_settings(GAMES_BOARD_POOL=dict(settings.GAMES_BOARD_POOL, CONFIGURATIONS=[]),
+                               ALLOWED_HOSTS=settings.ALLOWED_HOSTS + ['testserver']):
+            try:
+                for name in names:
+                    results[name] = self.run(scenarios[name], options['iterations'])
+            finally:
+                Game.objects.filter(pk__in=self.game_ids).delete()
+
+        self.stdout.write('%-16s %9s %9s %9s %9s %9s' % ('scenario', 'p50 ms', 'p90 ms', 'p99 ms', 'queries',
+                                                         'peak kb'))
+        for name, result in results.items():
+            self.stdout.write('%-16s %9.2f %9.2f %9.2f %9d %9.1f' % (
+                name, result['p50_ms'], result['p90_ms'], result['p99_ms'], result['queries'], result['peak_kb']))
+
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(options['baseline']), exist_ok=True)
+            with open(options['baseline'], 'w') as baseline_file:
+                json.dump(results, baseline_file, indent=2, sort_keys=True)
+            self.stdout.write('Baseline written to ' + options['baseline'])
+        elif os.path.exists(options['baseline']):
+            with open(options['baseline']) as baseline_file:
+                self.compare(results, json.load(baseline_file), options['threshold'])
+        else:
+            self.stdout.write('No baseline at ' + options['baseline'] + ', run with --save-baseline to store one')
+
+    def scenarios(self):
+        """
+        This method lists the scenarios, each a function preparing one request (untimed) and returning it
+        :return: dict of name -> function returning a callable
+        """
+        self.game_ids = []
+
+        def game(**kwargs):
+            new_game = create_game(**kwargs)
+            self.game_ids.append(new_game.pk)
+            return new_game
+
+        def block_url(new_game, index):
+            return '/games/blocks/' + str(Block.objects.get(game=new_game, index=index).pk) + '/'
+
+        def new_game():
+            def request():
+                response = self.client.post('/games/', {}, content_type='application/json')
+                self.game_ids.append(response.json()['id'])
+                return response
+            return request
+
+        def fetch():
+            # The state is dropped from the cache first, so the board is read and serialized
+            fetched = game(mines=[99])
+            state_cache.invalidate(fetched)
+            return lambda: self.client.get('/games/' + str(fetched.pk) + '/')
+
+        def flag():
+            url = block_url(game(mines=[5, 99]), 50)
+            return lambda: self.client.patch(url, {'is_flagged': True}, content_type='application/json')
+
+        def flip():
+            # Block 98 is next to the mine, so nothing is swept
+            url = block_url(game(mines=[99]), 98)
+            return lambda: self.client.patch(url, {'is_flipped': True}, content_type='application/json')
+
+        def first_flip():
+            # A posted game has no mines yet, the flip places them (the nearby mines count varies run to run)
+            response = self.client.post('/games/', {}, content_type='application/json')
+            self.game_ids.append(response.json()['id'])
+            url = block_url(Game.objects.get(pk=response.json()['id']), 0)
+            return lambda: self.client.patch(url, {'is_flipped': True}, content_type='application/json')
+
+        def big_sweep():
+            # The BigSweep layout, flipping the top left block opens every other block
+            url = block_url(game(mines=[99]), 0)
+            return lambda: self.client.patch(url, {'is_flipped': True}, content_type='application/json')
+
+        def win():
+            # Flagging the only mine wins the game
+            url = block_url(game(mines=[99]), 99)
+            return lambda: self.client.patch(url, {'is_flagged': True}, content_type='application/json')
+
+        return {'new_game': new_game, 'fetch': fetch, 'flag': flag, 'flip': flip, 'first_flip': first_flip,
+                'big_sweep': big_sweep, 'win': win}
+
+    def run(self, prepare, iterations):
+        """
+        This method times a scenario, then runs it again a few times under tracemalloc for its peak memory
+        :param prepare: function returning one request
+        :param iterations: number of timed requests
+        :return: results - dict
+        """
+        # A few untimed requests first, to warm up imports and caches
+        for _ in range(5):
+            prepare()()
+
+        latencies, queries = [], 0
+        for _ in range(iterations):
+            request = prepare()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = request()
+                latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise CommandError('Request failed with ' + str(response.status_code))
+            queries = max(queries, len(captured))
+
+        peak = 0
+        for _ in range(3):
+            request = prepare()
+            tracemalloc.start()
+            try:
+                request()
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+
+        return {
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p90_ms': percentile(latencies, 0.9) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'queries': queries,
+            'peak_kb': peak / 1024,
+        }
+
+    def compare(self, results, baseline, threshold):
+        """
+        This method checks the results against the baseline
+        :return: void, or throw CommandError listing the regressions
+        """
+        regressions = []
+        for name, result in results.items():
+            if name not in baseline:
+                continue
+            for field, relative in COMPARED:
+                allowed = baseline[name][field] * (1 + threshold) if relative else baseline[name][field]
+                if result[field] > allowed:
+                    regressions.append('%s %s: %.2f, baseline %.2f' % (name, field, result[field],
+                                                                      baseline[name][field]))
+
+        if regressions:
+            raise CommandError('Regressions over the baseline:\n' + '\n'.join(regressions))
+        self.stdout.write('No regressions over the baseline (threshold %d%%)' % (threshold * 100))
@@ -0,0 +1,180 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.core.wsgi import get_wsgi_application
+
+from games.models import Game
+from server.asgi_bridge import WsgiToAsgi, build_environ
+
+
+def request_scope(method, path):
+    """
+    This method builds the ASGI scope of a JSON request
+    :param method: http method
+    :param path: url path
+    :return: ASGI scope - dict
+    """
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'content-type', b'application/json')],
+        'client': ('127.0.0.1', 0),
+        'server': ('localhost', 80),
+    }
+
+
+def percentile(values, fraction):
+    """
+    This method picks the nearest rank percentile of a list of latencies
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Command(BaseCommand):
+    help = 'Compare WSGI and ASGI throughput and latency under concurrent new game and flip traffic'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=32, help='Concurrent clients')
+        parser.add_argument('--rounds', type=int, default=5, help='New game and flip round trips per client')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Sync WSGI workers, and threads of the ASGI executor')
+        parser.add_argument('--passes', type=int, default=2,
+                            help='Timed passes of both servers, which one goes first alternates every pass')
+
+    def handle(self, *args, **options):
+        clients, rounds, workers = options['clients'], options['rounds'], options['workers']
+        wsgi_application = get_wsgi_application()
+        asgi_application = WsgiToAsgi(wsgi_application, max_workers=workers)
+        self.game_ids = []
+
+        servers = {
+            'wsgi': lambda rounds: self.run_wsgi(wsgi_application, clients, rounds, workers),
+            'asgi': lambda rounds: self.run_asgi(asgi_application, clients, rounds),
+        }
+
+        # Keep the board pool out of the way, its background refill would compete with the requests being timed
+        results = {name: ([], 0.0) for name in servers}
+        with override_settings(GAMES_BOARD_POOL=dict(settings.GAMES_BOARD_POOL, CONFIGURATIONS=[])):
+            try:
+                # An untimed round on each server first, so neither pays for a cold start
+                for run in servers.values():
+                    run(1)
+
+                # Alternate which server goes first, so neither always runs on a fresher database
+                for number in range(options['passes']):
+                    names = list(servers) if number % 2 == 0 else list(reversed(list(servers)))
+                    for name in names:
+                        latencies, elapsed = servers[name](rounds)
+                        results[name] = (results[name][0] + latencies, results[name][1] + elapsed)
+            finally:
+                # Leave no benchmark games behind
+                Game.objects.filter(pk__in=self.game_ids).delete()
+
+        self.stdout.write('%6s %8s %10s %10s %10s' % ('server', 'requests', 'req / s', 'p50 ms', 'p99 ms'))
+        for name, (latencies, elapsed) in results.items():
+            self.report(name, latencies, elapsed)
+
+    def report(self, name, latencies, elapsed):
+        self.stdout.write('%6s %8d %10.1f %10.2f %10.2f' % (
+            name, len(latencies), len(latencies) / elapsed, percentile(latencies, 0.5) * 1e3,
+            percentile(latencies, 0.99) * 1e3))
+
+    def run_wsgi(self, application, clients, rounds, workers):
+        """
+        This method sends every client's requests, each from its own thread, to a fixed pool of blocking workers
+        :return: (latencies, elapsed seconds)
+        """
+        def serve(method, path, body):
+            data = json.dumps(body).encode()
+            environ = build_environ(request_scope(method, path), data)
+            environ['CONTENT_LENGTH'] = str(len(data))
+            result = application(environ, lambda status, headers, exc_info=None: None)
+            try:
+                return json.loads(b''.join(result))
+            finally:
+                result.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            def call(method, path, body):
+                return pool.submit(serve, method, path, body).result()
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=clients) as client_threads:
+                results = list(client_threads.map(lambda _: self.client(call, rounds), range(clients)))
+            elapsed = time.perf_counter() - start
+        return [latency for result in results for latency in result], elapsed
+
+    def client(self, call, rounds):
+        """
+        This method times the requests of one blocking client, each round a new game and a flip of its first block
+        :param call: callable (method, path, body) -> parsed response
+        :param rounds: number of rounds
+        :return: list of latencies
+        """
+        latencies = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            game = call('POST', '/games/', {})
+            latencies.append(time.perf_counter() - start)
+            self.game_ids.append(game['id'])
+
+            start = time.perf_counter()
+            call('PATCH', '/games/blocks/%d/' % game['blocks'][0]['id'], {'is_flipped': True})
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    def run_asgi(self, application, clients, rounds):
+        """
+        This method runs every client as a coroutine on one event loop, views run in the application's executor
+        :return: (latencies, elapsed seconds)
+        """
+        async def call(method, path, body):
+            data = json.dumps(body).encode()
+            scope = request_scope(method, path)
+            scope['headers'].append((b'content-length', str(len(data)).encode()))
+            sent = []
+            messages = [{'type': 'http.request', 'body': data, 'more_body': False}]
+
+            async def receive():
+                # Once the body is read the client stays connected
+                if not messages:
+                    await asyncio.Event().wait()
+                return messages.pop()
+
+            async def send(message):
+                sent.append(message)
+
+            await application(scope, receive, send)
+            return json.loads(b''.join(message.get('body', b'') for message in sent))
+
+        async def client():
+            latencies = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                game = await call('POST', '/games/', {})
+                latencies.append(time.perf_counter() - start)
+                self.game_ids.append(game['id'])
+
+                start = time.perf_counter()
+                await call('PATCH', '/games/blocks/%d/' % game['blocks'][0]['id'], {'is_flipped': True})
+                latencies.append(time.perf_counter() - start)
+            return latencies
+
+        async def main():
+            results = await asyncio.gather(*(client() for _ in range(clients)))
+            return [latency for result in results for latency in result]
+
+        start = time.perf_counter()
+        latencies = asyncio.run(main())
+        return latencies, time.perf_counter() - start
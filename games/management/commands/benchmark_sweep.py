@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from games.board import Board
+from games.sweeper import sweeper
+
+
+class Command(BaseCommand):
+    help = 'Time a full board flood fill on generated boards of growing size to check it scales linearly'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 200, 400, 800],
+                            help='Side lengths of the square boards to sweep')
+        parser.add_argument('--repeat', type=int, default=3, help='Sweeps per size, the fastest one is kept')
+
+    def handle(self, *args, **options):
+        self.stdout.write('%8s %10s %10s %12s' % ('size', 'blocks', 'seconds', 'us / block'))
+
+        per_block = []
+        for side in options['sizes']:
+            # One mine in the bottom right corner, so the sweep opens every other block (the BigSweep layout)
+            generated = Board.generate(mines=[side * side - 1], width=side, height=side)
+
+            best = None
+            for _ in range(options['repeat']):
+                board = Board(width=side, height=side, mines=generated.mines, nearby=generated.nearby)
+                start = time.perf_counter()
+                sweeper.sweep(board, 0)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+
+            blocks = side * side
+            per_block.append(best / blocks)
+            self.stdout.write('%8s %10d %10.3f %12.3f' % (str(side) + 'x' + str(side), blocks, best,
+                                                          best / blocks * 1e6))
+
+        # Linear scaling keeps the time per block flat as the board grows
+        self.stdout.write('Time per block, largest over smallest board: %.2f' % (per_block[-1] / per_block[0]))
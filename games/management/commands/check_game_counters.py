@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from games.models import Game, Block, block_counts
+
+COUNTED_FIELDS = ('mine_count', 'flags_placed', 'mines_flagged', 'safe_hidden')
+
+
+class Command(BaseCommand):
+    help = 'Check the running counters of every game against a count of its board, and optionally fix them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Write the counted values over wrong counters')
+
+    def handle(self, *args, **options):
+        # Every row game counted in one grouped aggregate query, packed games from their board
+        counted = {row.pop('game'): row for row in
+                   Block.objects.values('game').order_by('game').annotate(**block_counts()).iterator()}
+        for game in Game.objects.filter(is_packed=True).iterator():
+            counted[game.pk] = game.count_blocks()
+
+        wrong = 0
+        for game in Game.objects.filter(pk__in=counted).only('pk', 'mines_placed', *COUNTED_FIELDS).iterator():
+            counts = counted[game.pk]
+            # Games still waiting for their first flip have no mines on the board yet
+            fields = [field for field in COUNTED_FIELDS if getattr(game, field) != counts[field]
+                      and (field != 'mine_count' or game.mines_placed)]
+            if not fields:
+                continue
+            wrong += 1
+            self.stdout.write('Game %d: %s' % (game.pk, ', '.join(
+                '%s %d, counted %d' % (field, getattr(game, field), counts[field]) for field in fields)))
+            if options['fix']:
+                Game.objects.filter(pk=game.pk).update(**{field: counts[field] for field in fields})
+
+        self.stdout.write('%d games checked, %d with wrong counters%s' % (
+            len(counted), wrong, ' (fixed)' if options['fix'] and wrong else ''))
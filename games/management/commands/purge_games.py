@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from games.models import Game
+from games.purge import purge_games, expired_games
+
+
+class Command(BaseCommand):
+    help = ('Delete finished games after a number of days and idle games after a number of hours (see '
+            'settings.GAMES_RETENTION), in batches, run it from a scheduler such as cron')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--finished-days', type=float, help='Days finished games are kept')
+        parser.add_argument('--idle-hours', type=float, help='Hours unfinished games are kept since their last move')
+        parser.add_argument('--tests', action='store_true', help='Delete every automation test game instead')
+        parser.add_argument('--batch-size', type=int, help='Games deleted per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the games that would be deleted')
+
+    def handle(self, *args, **options):
+        if options['tests']:
+            games = Game.objects.filter(is_test=True)
+        else:
+            games = expired_games(finished_days=options['finished_days'], idle_hours=options['idle_hours'])
+
+        if options['dry_run']:
+            self.stdout.write('%d games would be deleted' % games.count())
+            return
+
+        def progress(deleted_games, deleted_blocks, seconds):
+            self.stdout.write('Deleted %d games and %d blocks in %.1f s' % (deleted_games, deleted_blocks, seconds))
+            self.last_seconds = seconds
+
+        self.last_seconds = 0
+        deleted_games, deleted_blocks = purge_games(games, batch_size=options['batch_size'], progress=progress)
+        rate = deleted_games / self.last_seconds if self.last_seconds else 0
+        self.stdout.write('Done: %d games and %d blocks deleted (%.0f games / s)' % (deleted_games, deleted_blocks,
+                                                                                    rate))
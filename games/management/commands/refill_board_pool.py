@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from games.pool import board_pool
+
+
+class Command(BaseCommand):
+    help = 'Fill the pool of ready made boards up to its high watermark wherever it is below the low watermark'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep refilling every this many seconds instead of once')
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            made = board_pool.refill()
+            if made:
+                self.stdout.write('Made %d boards in %.2f s' % (made, time.perf_counter() - start))
+            for depth in board_pool.stats()['depth']:
+                self.stdout.write('%(width)dx%(height)d with %(mines)d mines: %(boards)d boards' % depth)
+
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
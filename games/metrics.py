@@ -0,0 +1,147 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds of the histogram buckets, for durations in seconds and for counts (such as SQL queries)
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# Stats of the request this thread is serving, set by games.middleware.RequestMetricsMiddleware
+current_request = threading.local()
+
+
+class Histogram:
+    """
+    This class counts observed values in fixed buckets, along with their sum, the way Prometheus histograms do
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)      # The last one is for values above every bucket
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """
+        This method lists the number of values at or below each bucket bound, ending with +Inf
+        :return: list of (bound, count)
+        """
+        total, result = 0, []
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class Metrics:
+    """
+    This class keeps named counters and histograms for the games app, optionally labelled, safe to update from many
+    threads
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}      # (name, labels) -> value
+        self.histograms = {}    # (name, labels) -> Histogram obj
+
+    @staticmethod
+    def key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def increment(self, name, value=1, **labels):
+        """
+        This method adds to a counter
+        :param name: name of the counter
+        :param value: amount to add
+        :param labels: label values of the counter
+        :return: void
+        """
+        key = self.key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def value(self, name, **labels):
+        """
+        This method reads a counter
+        :param name: name of the counter
+        :param labels: label values of the counter
+        :return: counter value - int
+        """
+        return self.counters.get(self.key(name, labels), 0)
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        """
+        This method adds a value to a histogram
+        :param name: name of the histogram
+        :param value: observed value
+        :param buckets: bucket bounds, used when the histogram is first observed
+        :param labels: label values of the histogram
+        :return: void
+        """
+        key = self.key(name, labels)
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+
+    def histogram(self, name, **labels):
+        """
+        This method finds a histogram
+        :return: Histogram obj, or None if nothing was observed
+        """
+        return self.histograms.get(self.key(name, labels))
+
+    def render(self):
+        """
+        This method writes every counter and histogram in the Prometheus text format
+        :return: str
+        """
+        def series(name, labels, value):
+            label_text = ','.join('%s="%s"' % (label, str(text).replace('"', '\\"')) for label, text in labels)
+            return name + ('{' + label_text + '}' if label_text else '') + ' ' + str(value)
+
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, histogram.cumulative(), histogram.sum, histogram.count)
+                                for key, histogram in self.histograms.items())
+
+        lines, typed = [], set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append('# TYPE ' + name + ' counter')
+            lines.append(series(name, labels, value))
+        for (name, labels), buckets, total, count in histograms:
+            if name not in typed:
+                typed.add(name)
+                lines.append('# TYPE ' + name + ' histogram')
+            for bound, bucket_count in buckets:
+                lines.append(series(name + '_bucket', labels + (('le', bound),), bucket_count))
+            lines.append(series(name + '_sum', labels, total))
+            lines.append(series(name + '_count', labels, count))
+        return '\n'.join(lines) + '\n'
+
+
+def timed_serialization(function):
+    """
+    This decorator adds the time spent in a function to the serialization time of the current request
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stats = getattr(current_request, 'stats', None)
+            if stats is not None:
+                stats.serialize_seconds += time.perf_counter() - start
+    return wrapper
+
+
+metrics = Metrics()
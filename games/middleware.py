@@ -0,0 +1,74 @@
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from games.metrics import metrics, current_request, COUNT_BUCKETS
+
+
+class RequestStats:
+    """
+    This class adds up the SQL queries and serialization time of one request
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.render_start = None
+
+    def time_query(self, execute, sql, params, many, context):
+        # Database execute wrapper, see connection.execute_wrapper
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_seconds += time.perf_counter() - start
+
+    def rendered(self, response):
+        # Post render callback, the rendering of the response counts as serialization
+        self.serialize_seconds += time.perf_counter() - self.render_start
+
+
+class RequestMetricsMiddleware:
+    """
+    This middleware records the latency, SQL queries and serialization time of every request by view, exported
+    from GET /games/metrics/
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = current_request.stats = RequestStats()
+        start = time.perf_counter()
+        try:
+            # Time the queries of every database connection this thread uses
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats.time_query))
+                response = self.get_response(request)
+        finally:
+            current_request.stats = None
+        elapsed = time.perf_counter() - start
+
+        view = getattr(request, 'metrics_view', 'unmatched')
+        metrics.increment('games_requests_total', view=view, method=request.method, status=response.status_code)
+        metrics.observe('games_request_seconds', elapsed, view=view)
+        metrics.observe('games_request_queries', stats.queries, buckets=COUNT_BUCKETS, view=view)
+        metrics.increment('games_request_query_seconds_total', stats.query_seconds, view=view)
+        metrics.observe('games_request_serialize_seconds', stats.serialize_seconds, view=view)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Label the request with the name of its view class (or function)
+        request.metrics_view = getattr(view_func, 'view_class', view_func).__name__
+
+    def process_template_response(self, request, response):
+        # Responses rendered after the view (such as REST framework ones) are timed up to the end of rendering
+        stats = getattr(current_request, 'stats', None)
+        if stats is not None:
+            stats.render_start = time.perf_counter()
+            response.add_post_render_callback(stats.rendered)
+        return response
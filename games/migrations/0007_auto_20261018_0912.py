@@ -0,0 +1,23 @@
+# Generated by Django 2.2.5 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0006_block_nearby_mines'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='board_data',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='is_packed',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.5 on 2026-10-18 09:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0007_auto_20261018_0912'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='height',
+            field=models.PositiveIntegerField(default=10),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='mine_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='width',
+            field=models.PositiveIntegerField(default=10),
+        ),
+    ]
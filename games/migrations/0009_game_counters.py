@@ -0,0 +1,68 @@
+# Generated by Django 2.2.5 on 2026-10-18 09:16
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+from games.storage import unpack_board
+
+
+def count_game_counters(apps, schema_editor):
+    """
+    Fill in the mine count and counters of existing games from their blocks
+    """
+    Game = apps.get_model('games', 'Game')
+    Block = apps.get_model('games', 'Block')
+    fields = ['mine_count', 'flags_placed', 'mines_flagged', 'safe_hidden']
+
+    # Every game with Block rows counted in one grouped aggregate query
+    hidden_flag = Q(is_flagged=True, is_flipped=False)
+    counts = Block.objects.values('game').order_by('game').annotate(
+        mine_count=Count('pk', filter=Q(is_mine=True)),
+        flags_placed=Count('pk', filter=hidden_flag),
+        mines_flagged=Count('pk', filter=hidden_flag & Q(is_mine=True)),
+        safe_hidden=Count('pk', filter=Q(is_mine=False, is_flipped=False)),
+    )
+    for row in counts.iterator():
+        Game.objects.filter(pk=row['game'], is_packed=False).update(**{field: row[field] for field in fields})
+
+    # Packed games are counted from their board
+    for game in Game.objects.filter(is_packed=True).iterator():
+        mines, flipped, flagged, _ = unpack_board(game.board_data, game.width * game.height)
+        game.mine_count = game.flags_placed = game.mines_flagged = game.safe_hidden = 0
+        for is_mine, is_flipped, is_flagged in zip(mines, flipped, flagged):
+            flag = not is_flipped and is_flagged
+            game.mine_count += is_mine
+            game.flags_placed += bool(flag)
+            game.mines_flagged += bool(flag and is_mine)
+            game.safe_hidden += bool(not is_flipped and not is_mine)
+        game.save(update_fields=fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0008_auto_20261018_0913'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='game',
+            name='flags_left',
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='flags_placed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='mines_flagged',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='safe_hidden',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_game_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.5 on 2026-10-18 09:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0009_game_counters'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='block',
+            options={'ordering': ('index',)},
+        ),
+        migrations.AddConstraint(
+            model_name='block',
+            constraint=models.UniqueConstraint(fields=('game', 'index'), name='unique_block_game_index'),
+        ),
+        migrations.AlterField(
+            model_name='block',
+            name='game',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='blocks', to='games.Game'),
+        ),
+        migrations.AddIndex(
+            model_name='block',
+            index=models.Index(condition=models.Q(is_mine=True), fields=['game'], name='block_game_mine_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='block',
+            index=models.Index(condition=models.Q(('is_flagged', True), ('is_flipped', False)), fields=['game'], name='block_game_flag_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.5 on 2026-10-18 09:25
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0010_auto_20261018_0919'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
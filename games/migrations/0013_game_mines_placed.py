@@ -0,0 +1,18 @@
+# Generated by Django 2.2.5 on 2026-10-18 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0012_game_is_pooled'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='mines_placed',
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.5 on 2026-10-18 10:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0013_game_mines_placed'),
+    ]
+
+    # SQLite rebuilds the table to add the column, and Django 2.2 rebuilds the partial index with a condition on
+    # the temporary table name, so the index is dropped first and added back after
+    operations = [
+        migrations.RemoveIndex(
+            model_name='game',
+            name='game_pool_idx',
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(condition=models.Q(is_pooled=True), fields=['width', 'height', 'mine_count'], name='game_pool_idx'),
+        ),
+    ]
@@ -1,30 +1,108 @@
 from django.db import models
+from django.db.models import Count, Q
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 # Global constants
-from games.constants import NUMBER_OF_BLOCKS
+from games.constants import BOARD_WIDTH, BOARD_HEIGHT
 
 
 class Game(models.Model):
     # Is this game part of an automation test
     is_test = models.BooleanField(default=False)
 
+    # Is this a ready made board waiting in the pool to be claimed as a new game
+    is_pooled = models.BooleanField(default=False)
+
+    # When the game was created and last played, and a version that goes up with every change to the board
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    version = models.PositiveIntegerField(default=0)
+
     # Progress of the game
     has_lost = models.BooleanField(default=False)
     has_won = models.BooleanField(default=False)
-    flags_left = models.PositiveIntegerField(default=0)
+
+    # Running counters kept up to date by every flip and flag
+    flags_placed = models.PositiveIntegerField(default=0)     # Flagged blocks that are not flipped
+    mines_flagged = models.PositiveIntegerField(default=0)    # Flagged mines that are not flipped
+    safe_hidden = models.PositiveIntegerField(default=0)      # Blocks that are neither mines nor flipped
+
+    # Size of the board and number of mines on it
+    width = models.PositiveIntegerField(default=BOARD_WIDTH)
+    height = models.PositiveIntegerField(default=BOARD_HEIGHT)
+    mine_count = models.PositiveIntegerField(default=0)
+
+    # Are the mines on the board yet (new games place them on the first flip, away from the flipped block)
+    mines_placed = models.BooleanField(default=True)
+
+    # Optionally keep the whole board packed in this row instead of in Block rows
+    is_packed = models.BooleanField(default=False)
+    board_data = models.BinaryField(null=True, blank=True)
+
+    # Board the game was created with, and whether its creator writes the blocks (see games.board.create_games)
+    # instead of an empty board being written when the game is saved
+    initial_board = None
+    defer_blocks = False
+
+    class Meta:
+        indexes = [
+            # Partial index for finding the pooled boards of a size
+            models.Index(fields=['width', 'height', 'mine_count'], condition=models.Q(is_pooled=True),
+                         name='game_pool_idx'),
+        ]
 
     # Display string as game pk
     def __str__(self):
         return str(self.pk)
 
+    @property
+    def flags_left(self):
+        """
+        This method returns the number of flags from the number of needed flags
+        :return: Flags left - int
+        """
+        return self.mine_count - self.flags_placed
+
+    def count_blocks(self):
+        """
+        This method counts the mines and game counters over the whole board, with a single aggregate query over the
+        Block rows (or none for a packed game), to check the running counters against
+        :return: dict of mine_count and counter values
+        """
+        if self.is_packed:
+            from games.board import Board
+            board = Board.load(self)
+            return dict(mine_count=sum(board.mines), **board.counters())
+        return self.blocks.aggregate(**block_counts())
+
+    def all_mines_flagged(self):
+        """
+        This method checks if every mine is flagged (the game is won)
+        :return: boolean
+        """
+        return self.mine_count > 0 and self.mines_flagged == self.mine_count
+
+
+def block_counts():
+    """
+    This method builds the conditional counts of Block rows that make up the mine count and counters of a game
+    :return: dict of aggregate expressions
+    """
+    hidden_flag = Q(is_flagged=True, is_flipped=False)
+    return {
+        'mine_count': Count('pk', filter=Q(is_mine=True)),
+        'flags_placed': Count('pk', filter=hidden_flag),
+        'mines_flagged': Count('pk', filter=hidden_flag & Q(is_mine=True)),
+        'safe_hidden': Count('pk', filter=Q(is_mine=False, is_flipped=False)),
+    }
+
 
 class Block(models.Model):
-    # Every block is associated to a game
-    game = models.ForeignKey(Game, related_name='blocks', on_delete=models.CASCADE)
+    # Every block is associated to a game (looked up through the (game, index) index below)
+    game = models.ForeignKey(Game, related_name='blocks', on_delete=models.CASCADE, db_index=False)
 
-    # Where is the block (position 0 to 99)
+    # Where is the block (position 0 to width * height - 1, row by row)
     index = models.PositiveIntegerField()
 
     # Is the block a mine, flipped or flagged
@@ -35,56 +113,42 @@ class Block(models.Model):
     # Count the nearby mines
     nearby_mines = models.PositiveIntegerField(default=0)
 
-    # Order in ascending index
-    ordering = ('index',)
+    class Meta:
+        # Order in ascending index
+        ordering = ('index',)
+
+        constraints = [
+            # A game has one block per index, which also indexes the board in order
+            models.UniqueConstraint(fields=['game', 'index'], name='unique_block_game_index'),
+        ]
+        indexes = [
+            # Partial indexes for counting the mines and flags of a game
+            models.Index(fields=['game'], condition=models.Q(is_mine=True), name='block_game_mine_idx'),
+            models.Index(fields=['game'], condition=models.Q(is_flagged=True, is_flipped=False),
+                         name='block_game_flag_idx'),
+        ]
 
     # Display string as an index belonging to a game's pk
     def __str__(self):
         return str(self.game.pk) + ' - ' + str(self.index)
 
 
-def update_flags_left(game):
-    """
-    This method returns the number of flags from the number of needed flags
-    :param game: Game Obj
-    :return: Flags left - int
-    """
-    mine_blocks = Block.objects.filter(game=game, is_mine=True)
-    flag_blocks = Block.objects.filter(game=game, is_flagged=True, is_flipped=False)
-    return len(mine_blocks) - len(flag_blocks)
-
-
 @receiver(post_save, sender=Game)
 def post_save_game_method(sender, instance, created, **kwargs):
     """
-    This method will create all the blocks for the flag and update the number of flags left
+    This method will create all the blocks for the game
     :param sender: Game Class
     :param instance: Game Obj
     :param created: Was this Obj just created
     :return: void
     """
-    # If created, create 100 blocks
-    if created:
-        for i in range(0, NUMBER_OF_BLOCKS):
-            Block.objects.create(game=instance, index=i)
-
-    # Update the number of flags left
-    if instance.flags_left is not update_flags_left(instance):
-        instance.flags_left = update_flags_left(instance)
-        instance.save()
-
-
-@receiver(post_save, sender=Block)
-def post_save_block_method(sender, instance, created, **kwargs):
-    """
-    This method takes a newly saves block and updates the number of neighbouring mines
-    :param sender: Block Class
-    :param instance: Block Obj
-    :param created: is this block newly created - boolean
-    :return: void
-    """
-    # Update the number of neighbouring mines if different
-    from games.sweeper import count_nearby_mines
-    if not created and instance.nearby_mines is not count_nearby_mines(instance):
-        instance.nearby_mines = count_nearby_mines(instance)
-        instance.save()
+    # If created, insert all the blocks of an empty board at once (unless it was packed up front or its creator
+    # writes the blocks)
+    if created and not instance.board_data and not instance.defer_blocks:
+        from games.board import Board
+        board = Board(game=instance, width=instance.width, height=instance.height)
+
+        # An empty board has every block safe and hidden
+        instance.safe_hidden = len(board)
+        Game.objects.filter(pk=instance.pk).update(safe_hidden=instance.safe_hidden)
+        board.insert()
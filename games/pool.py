@@ -0,0 +1,137 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from games.board import create_game
+from games.constants import MAX_ROW_BOARD_BLOCKS
+from games.metrics import metrics
+from games.models import Game
+
+logger = logging.getLogger(__name__)
+
+
+def random_game(width, height, mines, **kwargs):
+    """
+    This method creates a game with an empty board, its mines are placed at random on the first flip (large boards
+    are packed)
+    :param width: number of columns
+    :param height: number of rows
+    :param mines: number of mines
+    :param kwargs: extra Game fields
+    :return: Game obj
+    """
+    return create_game(width=width, height=height, mine_count=mines, mines_placed=False,
+                       is_packed=settings.GAMES_PACKED_STORAGE or width * height > MAX_ROW_BOARD_BLOCKS, **kwargs)
+
+
+class BoardPool:
+    """
+    This class keeps ready made boards for each configuration in settings.GAMES_BOARD_POOL, so a new game is a claim
+    of one row instead of a board generation
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.refilling = False      # Is a background refill running
+
+    @property
+    def options(self):
+        return settings.GAMES_BOARD_POOL
+
+    @staticmethod
+    def pooled(width, height, mines):
+        return Game.objects.filter(is_pooled=True, width=width, height=height, mine_count=mines)
+
+    def claim(self, width, height, mines):
+        """
+        This method takes a pooled board as a new game, asking for a refill when the pool runs low
+        :param width: number of columns
+        :param height: number of rows
+        :param mines: number of mines
+        :return: Game obj, or None if the pool has no board of this configuration
+        """
+        if (width, height, mines) not in self.options['CONFIGURATIONS']:
+            return None
+        start = time.perf_counter()
+
+        # A few candidates in one query, which also tells if the pool is running low
+        low = self.options['LOW_WATERMARK']
+        candidates = list(self.pooled(width, height, mines).order_by('pk').values_list('pk', flat=True)[:low + 1])
+        if len(candidates) <= low:
+            self.request_refill()
+
+        # Claim the first candidate no other request took in the meantime (it becomes new as of now)
+        game = None
+        for pk in candidates:
+            now = timezone.now()
+            if Game.objects.filter(pk=pk, is_pooled=True).update(is_pooled=False, created_at=now, updated_at=now):
+                game = Game.objects.get(pk=pk)
+                break
+
+        metrics.increment('games_pool_claims_total' if game else 'games_pool_misses_total')
+        metrics.increment('games_pool_claim_seconds_total', time.perf_counter() - start)
+        return game
+
+    def refill(self):
+        """
+        This method fills the pool of every configuration with fewer than LOW_WATERMARK boards up to HIGH_WATERMARK
+        :return: number of boards made
+        """
+        made = 0
+        for width, height, mines in self.options['CONFIGURATIONS']:
+            depth = self.pooled(width, height, mines).count()
+            if depth >= self.options['LOW_WATERMARK']:
+                continue
+            for _ in range(self.options['HIGH_WATERMARK'] - depth):
+                random_game(width, height, mines, is_pooled=True)
+                made += 1
+        metrics.increment('games_pool_boards_made_total', made)
+        return made
+
+    def request_refill(self):
+        """
+        This method refills the pool in a background thread, unless one is running or background refills are off
+        :return: void
+        """
+        if not self.options['REFILL_IN_BACKGROUND']:
+            return
+        with self.lock:
+            if self.refilling:
+                return
+            self.refilling = True
+        threading.Thread(target=self.refill_in_background, name='board-pool-refill', daemon=True).start()
+
+    def refill_in_background(self):
+        try:
+            self.refill()
+        except Exception:
+            logger.exception('Refilling the board pool failed')
+        finally:
+            # The thread has its own connection, closed with it
+            connection.close()
+            self.refilling = False
+
+    def stats(self):
+        """
+        This method reports the depth of each configuration, the claims and the average claim time
+        :return: dict
+        """
+        claims = metrics.value('games_pool_claims_total')
+        misses = metrics.value('games_pool_misses_total')
+        seconds = metrics.value('games_pool_claim_seconds_total')
+        return {
+            'depth': [{'width': width, 'height': height, 'mines': mines,
+                       'boards': self.pooled(width, height, mines).count()}
+                      for width, height, mines in self.options['CONFIGURATIONS']],
+            'claims': claims,
+            'misses': misses,
+            'boards_made': metrics.value('games_pool_boards_made_total'),
+            'average_claim_ms': seconds / (claims + misses) * 1000 if claims + misses else 0.0,
+        }
+
+
+board_pool = BoardPool()
@@ -0,0 +1,89 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from games.metrics import metrics
+from games.models import Game, Block
+
+
+def delete_game_rows(queryset, ids):
+    """
+    This method deletes the games of a queryset among some primary keys, and their blocks, with two plain DELETE
+    statements, without loading any model instance (so without Django's cascade collector). The games are locked and
+    checked against the queryset again first, so a game played since its id was read is kept
+    :param queryset: Game queryset
+    :param ids: primary keys of the games
+    :return: (games deleted, blocks deleted)
+    """
+    quote = connection.ops.quote_name
+    with transaction.atomic():
+        ids = list(queryset.filter(pk__in=ids).order_by('pk').select_for_update().values_list('pk', flat=True))
+        if not ids:
+            return 0, 0
+
+        placeholders = ', '.join(['%s'] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM ' + quote(Block._meta.db_table) + ' WHERE ' +
+                           quote(Block._meta.get_field('game').column) + ' IN (' + placeholders + ')', ids)
+            blocks = cursor.rowcount
+            cursor.execute('DELETE FROM ' + quote(Game._meta.db_table) + ' WHERE ' +
+                           quote(Game._meta.pk.column) + ' IN (' + placeholders + ')', ids)
+            games = cursor.rowcount
+    return games, blocks
+
+
+def purge_games(queryset, batch_size=None, progress=None):
+    """
+    This method deletes the games of a queryset and their blocks in bounded batches, each in its own transaction, so
+    memory and lock time stay flat however many games there are
+    :param queryset: Game queryset
+    :param batch_size: games per batch (settings.GAMES_RETENTION['BATCH_SIZE'] if None)
+    :param progress: callable taking (games deleted, blocks deleted, seconds) after each batch
+    :return: (games deleted, blocks deleted)
+    """
+    batch_size = batch_size or settings.GAMES_RETENTION['BATCH_SIZE']
+    start = time.perf_counter()
+    games = blocks = 0
+    last_pk = None
+    while True:
+        # Walk the primary keys in order, so rows that could not be deleted are never read again
+        batch = queryset.order_by('pk')
+        if last_pk is not None:
+            batch = batch.filter(pk__gt=last_pk)
+        ids = list(batch.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        last_pk = ids[-1]
+
+        deleted_games, deleted_blocks = delete_game_rows(queryset, ids)
+        games += deleted_games
+        blocks += deleted_blocks
+        if progress is not None:
+            progress(games, blocks, time.perf_counter() - start)
+
+    metrics.increment('games_purged_total', games)
+    return games, blocks
+
+
+def expired_games(finished_days=None, idle_hours=None, now=None):
+    """
+    This method finds the games past the retention policy: finished games not played for finished_days and
+    unfinished games not played for idle_hours (pooled boards are kept)
+    :param finished_days: days finished games are kept (settings.GAMES_RETENTION['FINISHED_DAYS'] if None)
+    :param idle_hours: hours unfinished games are kept (settings.GAMES_RETENTION['IDLE_HOURS'] if None)
+    :param now: current time, timezone.now() if None
+    :return: Game queryset
+    """
+    retention = settings.GAMES_RETENTION
+    finished_days = retention['FINISHED_DAYS'] if finished_days is None else finished_days
+    idle_hours = retention['IDLE_HOURS'] if idle_hours is None else idle_hours
+    now = now or timezone.now()
+
+    finished = Q(has_won=True) | Q(has_lost=True)
+    return Game.objects.filter(is_pooled=False).filter(
+        (finished & Q(updated_at__lt=now - timedelta(days=finished_days))) |
+        (~finished & Q(updated_at__lt=now - timedelta(hours=idle_hours))))
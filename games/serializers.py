@@ -1,47 +1,189 @@
+import numpy as np
 from rest_framework import serializers
-from games.models import Block
+from games.board import Board, as_array
+from games.metrics import timed_serialization
+from games.storage import packed_block_id
 
+# Global constants
+from games.constants import (BOARD_WIDTH, BOARD_HEIGHT, NUMBER_OF_MINES, MAX_BOARD_WIDTH, MAX_BOARD_HEIGHT,
+                             DIFFICULTIES, MOVE_ACTIONS, MAX_BATCH_MOVES, MAX_FIXTURE_GAMES, MAX_ROW_BOARD_BLOCKS)
 
-class PrivateBlockSerializer(serializers.ModelSerializer):
+
+class NewGameSerializer(serializers.Serializer):
+    """
+    Serializer for the size and mines of a new game, either as a difficulty or a custom board
+    """
+    difficulty = serializers.ChoiceField(choices=sorted(DIFFICULTIES), required=False)
+    width = serializers.IntegerField(min_value=2, max_value=MAX_BOARD_WIDTH, default=BOARD_WIDTH)
+    height = serializers.IntegerField(min_value=2, max_value=MAX_BOARD_HEIGHT, default=BOARD_HEIGHT)
+    mines = serializers.IntegerField(min_value=1, default=NUMBER_OF_MINES)
+
+    def validate(self, data):
+        # A difficulty overrides the custom size
+        if 'difficulty' in data:
+            data['width'], data['height'], data['mines'] = DIFFICULTIES[data.pop('difficulty')]
+
+        # The first flipped block is always kept free of mines
+        if data['mines'] > data['width'] * data['height'] - 1:
+            raise serializers.ValidationError({'mines': 'Too many mines for a board of this size.'})
+        return data
+
+
+class FixtureSerializer(serializers.Serializer):
+    """
+    Serializer for the number of games asked of an automation test fixture
+    """
+    count = serializers.IntegerField(min_value=1, max_value=MAX_FIXTURE_GAMES, required=False)
+
+
+class BlockMoveSerializer(serializers.Serializer):
+    """
+    Serializer for the changes a player can make to a block
     """
-    Serializer for the Block model
+    is_flipped = serializers.BooleanField(required=False)
+    is_flagged = serializers.BooleanField(required=False)
+
+
+class MoveSerializer(serializers.Serializer):
+    """
+    Serializer for one move of a batch, an action on the block at index
     """
-    class Meta(object):
-        model = Block
-        fields = ['id', 'is_flipped', 'is_flagged', 'game', 'index']
+    index = serializers.IntegerField(min_value=0)
+    action = serializers.ChoiceField(choices=sorted(MOVE_ACTIONS))
 
 
-class PublicBlockSerializer(serializers.ModelSerializer):
+class MoveBatchSerializer(serializers.Serializer):
     """
-    Serializer for the Block model
+    Serializer for a batch of moves, played in order
     """
-    is_mine = serializers.ReadOnlyField
+    moves = MoveSerializer(many=True, allow_empty=False)
+
+    def validate_moves(self, moves):
+        if len(moves) > MAX_BATCH_MOVES:
+            raise serializers.ValidationError('Ensure this field has no more than ' + str(MAX_BATCH_MOVES) +
+                                              ' elements.')
+        return moves
+
+
+# Fields shown for hidden blocks (flipped blocks, or every block once the game is lost, show all of them)
+PRIVATE_BLOCK_FIELDS = ('id', 'is_flipped', 'is_flagged', 'game', 'index')
 
-    class Meta(object):
-        model = Block
-        fields = '__all__'
 
+@timed_serialization
+def serialize_blocks(game, board=None):
+    """
+    This method builds the game state from a single read only query (or none if the board is already loaded)
+    :param game: Game obj
+    :param board: Board obj of the game, loaded if not given
+    :return: game state - dict
+    """
+    if board is None:
+        board = Board.load(game)
 
-def serialize_blocks(game):
-    # Run the save scripts to ensure
-    game.save()
+    # Large boards are far too big for a dict per block
+    if len(board) > MAX_ROW_BOARD_BLOCKS:
+        return serialize_compact(game, board)
 
     # Add private and public blocks to game
     data = []
-    for block in Block.objects.filter(game=game):
+    for row in board.values():
         # Display everything if the block is flipped or the game is over
-        if block.is_flipped or block.game.has_lost:
-            data.append(PublicBlockSerializer(block, many=False).data)
+        if row['is_flipped'] or game.has_lost:
+            data.append(row)
 
         # Otherwise don't display mine data
         else:
-            data.append(PrivateBlockSerializer(block, many=False).data)
+            data.append({field: row[field] for field in PRIVATE_BLOCK_FIELDS})
 
     # Return the data
     return {
         "id": game.pk,
+        "width": game.width,
+        "height": game.height,
         "blocks": data,
         "has_won": game.has_won,
         "has_lost": game.has_lost,
         "flags_left": game.flags_left
     }
+
+
+def serialize_compact(game, board):
+    """
+    This method builds the game state of a large board with one character per block instead of a dict per block
+    :param game: Game obj
+    :param board: Board obj of the game
+    :return: game state - dict
+    """
+    mines, flipped, flagged, nearby = (as_array(values) for values in (board.mines, board.flipped, board.flagged,
+                                                                       board.nearby))
+
+    # State of every block: 0 hidden, 1 flipped, 2 flagged, 3 flipped and flagged
+    state = flipped + 2 * flagged + ord('0')
+
+    # What a block shows: its nearby mines or * for a mine, - while it is hidden (until the game is lost)
+    shown = flipped.astype(bool) | game.has_lost
+    values = np.where(shown, np.where(mines.astype(bool), ord('*'), nearby + ord('0')), ord('-')).astype(np.uint8)
+
+    data = {
+        "id": game.pk,
+        "width": game.width,
+        "height": game.height,
+        "blocks_state": state.tobytes().decode(),
+        "blocks_shown": values.tobytes().decode(),
+        "has_won": game.has_won,
+        "has_lost": game.has_lost,
+        "flags_left": game.flags_left
+    }
+
+    # Packed blocks have an id per index, block rows list theirs
+    if board.ids is None:
+        data["first_block_id"] = packed_block_id(game.pk, 0)
+    else:
+        data["block_ids"] = board.ids
+    return data
+
+
+@timed_serialization
+def serialize_delta(game, board, changed, revealed):
+    """
+    This method builds a compact game state with only the blocks changed by a move
+    :param game: Game obj
+    :param board: Board obj after the move
+    :param changed: indexes of every block the move changed
+    :param revealed: indexes of the blocks the sweep flipped
+    :return: game changes - dict
+    """
+    swept = set(revealed)
+
+    # Blocks changed by the move itself, by index, shown like in the full state
+    blocks = []
+    for index in sorted(set(changed) - swept):
+        block = {'index': index, 'is_flipped': bool(board.flipped[index]), 'is_flagged': bool(board.flagged[index])}
+        if board.flipped[index] or game.has_lost:
+            block['is_mine'] = bool(board.mines[index])
+            block['nearby_mines'] = board.nearby[index]
+        blocks.append(block)
+
+    # Swept blocks (never mines) as [start, stop) runs of indexes plus one nearby mines digit per block
+    ordered = sorted(swept)
+    runs = []
+    for index in ordered:
+        if runs and runs[-1][1] == index:
+            runs[-1][1] = index + 1
+        else:
+            runs.append([index, index + 1])
+
+    data = {
+        "id": game.pk,
+        "blocks": blocks,
+        "revealed": runs,
+        "revealed_nearby_mines": ''.join(str(board.nearby[index]) for index in ordered),
+        "has_won": game.has_won,
+        "has_lost": game.has_lost,
+        "flags_left": game.flags_left
+    }
+
+    # Every mine is shown once the game is lost
+    if game.has_lost:
+        data["mines"] = [index for index in range(len(board)) if board.mines[index]]
+    return data
@@ -0,0 +1,108 @@
+# Packed boards start with this byte so the layout can change later
+PACKED_FORMAT_VERSION = 1
+
+# Packed games have no Block rows, so their blocks get ids above every real Block pk:
+# PACKED_BLOCK_ID_BASE + game pk * PACKED_BLOCK_ID_STRIDE + index
+PACKED_BLOCK_ID_BASE = 2 ** 40
+PACKED_BLOCK_ID_STRIDE = 2 ** 20
+
+
+def packed_block_id(game_id, index):
+    """
+    This method maps a block of a packed game to its public id
+    :param game_id: Primary key of the Game obj
+    :param index: index of the block
+    :return: block id - int
+    """
+    return PACKED_BLOCK_ID_BASE + game_id * PACKED_BLOCK_ID_STRIDE + index
+
+
+def split_packed_block_id(block_id):
+    """
+    This method maps a public block id back to its packed game and index
+    :param block_id: block id - int
+    :return: (game pk, index) or None for the id of a Block row
+    """
+    if block_id < PACKED_BLOCK_ID_BASE:
+        return None
+    return divmod(block_id - PACKED_BLOCK_ID_BASE, PACKED_BLOCK_ID_STRIDE)
+
+
+# Byte to character tables so whole bitmaps can be converted with int() instead of a loop per block
+BITS_TO_CHARS = bytes.maketrans(b'\x00\x01', b'01')
+CHARS_TO_BITS = bytes.maketrans(b'01', b'\x00\x01')
+
+
+def pack_bits(values):
+    """
+    This method packs one byte per block into one bit per block (block 0 is the lowest bit)
+    :param values: bytearray of 0 and 1
+    :return: bytes
+    """
+    if not values:
+        return b''
+    return int(bytes(values).translate(BITS_TO_CHARS)[::-1], 2).to_bytes((len(values) + 7) // 8, 'little')
+
+
+def unpack_bits(packed, size):
+    """
+    This method unpacks one bit per block into one byte per block
+    :param packed: bytes
+    :param size: number of blocks
+    :return: bytearray
+    """
+    chars = format(int.from_bytes(packed[:(size + 7) // 8], 'little'), 'b').zfill(size)[::-1][:size]
+    return bytearray(chars.encode().translate(CHARS_TO_BITS))
+
+
+def pack_nibbles(values):
+    """
+    This method packs the nearby mine counts (0 to 8) two per byte
+    :param values: bytearray of counts
+    :return: bytes
+    """
+    low, high = values[0::2], values[1::2] + bytearray(len(values) & 1)
+    return bytes(a | b << 4 for a, b in zip(low, high))
+
+
+def unpack_nibbles(packed, size):
+    """
+    This method unpacks the nearby mine counts
+    :param packed: bytes
+    :param size: number of blocks
+    :return: bytearray
+    """
+    packed = packed[:(size + 1) // 2]
+    nearby = bytearray(2 * len(packed))
+    nearby[0::2] = bytes(byte & 15 for byte in packed)
+    nearby[1::2] = bytes(byte >> 4 for byte in packed)
+    return nearby[:size]
+
+
+def pack_board(board):
+    """
+    This method packs a whole board: a version byte, the mine, flipped and flagged bitmaps then the nearby counts
+    :param board: Board obj
+    :return: bytes
+    """
+    return bytes([PACKED_FORMAT_VERSION]) + pack_bits(board.mines) + pack_bits(board.flipped) + \
+        pack_bits(board.flagged) + pack_nibbles(board.nearby)
+
+
+def unpack_board(data, size):
+    """
+    This method unpacks a whole board
+    :param data: bytes written by pack_board
+    :param size: number of blocks
+    :return: (mines, flipped, flagged, nearby) bytearrays
+    """
+    data = bytes(data)
+    if data[0] != PACKED_FORMAT_VERSION:
+        raise ValueError('Unknown packed board format ' + str(data[0]))
+
+    bits = (size + 7) // 8
+    mines = unpack_bits(data[1:], size)
+    flipped = unpack_bits(data[1 + bits:], size)
+    flagged = unpack_bits(data[1 + 2 * bits:], size)
+    nearby = unpack_nibbles(data[1 + 3 * bits:], size)
+    return mines, flipped, flagged, nearby
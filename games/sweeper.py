@@ -1,235 +1,71 @@
-from games.models import Block
+from games.board import Board, as_array, surroundings, zero_area
 
 
-class BlockQueue:
-    """
-    This data structure queue's blocks, but only once (to reduce looping and redundancy)
-    """
-
-    def __init__(self):
-        self.items = []         # Blocks to be visited in a BFS order
-        self.visited = set()    # Visited Blocks cannot be added again
-
-    def is_empty(self):
+class Sweeper:
+    def sweep(self, board, first_index):
         """
-        This method checks if the queue is empty
-        :return: boolean on if the queue is empty
+        This function opens the area of (right angle) adjacent blocks with no nearby mines around a block, along with
+        every neighbour of that area, working on the board arrays in memory
+        :param board: Board obj
+        :param first_index: index of the block to start from
+        :return: indexes of the blocks the sweep flipped - list
         """
-        return self.items == []
+        if not board.check_no_mines(first_index):
+            return []
 
-    def enqueue_unique(self, item):
-        """
-        This method checks and adds only unique Blocks in O(1)
-        :param item: Block obj
-        :return: void
-        """
-        if item not in self.visited:
-            self.items.insert(0, item)
-            self.visited.add(item)
+        # Label the blocks with no nearby mines that join the first block
+        mines, flipped, nearby = (as_array(values) for values in (board.mines, board.flipped, board.nearby))
+        area = zero_area(mines, nearby, board.width, first_index)
+
+        # Flip the area and its neighbours (corners included) that are still hidden
+        opened = surroundings(area, board.width, board.height)
+        revealed = opened[flipped[opened] == 0]
+        board.flip_all(revealed)
+        return revealed.tolist()
 
-    def dequeue(self):
+    def move(self, board, index, is_flipped=None, is_flagged=None):
         """
-        This method removes the oldest item from queue
-        :return: Block obj
+        This function plays a move on a board in memory: changes the block, sweeps and updates the game result
+        :param board: Board obj
+        :param index: index of the block
+        :param is_flipped: new flipped state (unchanged if None)
+        :param is_flagged: new flagged state (unchanged if None)
+        :return: names of the Game result fields that changed - list, indexes of the blocks swept open - list
         """
-        return self.items.pop()
-
-
-# Get the top left neighbour block if it exists
-def get_top_left(block):
-    return Block.objects.get(game=block.game,
-                             index=block.index - 11) if block.index > 9 and block.index % 10 is not 0 else None
-
-
-# Get the top center neighbour block if it exists
-def get_top(block):
-    return Block.objects.get(game=block.game, index=block.index - 10) if block.index > 9 else None
-
-
-# Get the top right neighbour block if it exists
-def get_top_right(block):
-    return Block.objects.get(game=block.game,
-                             index=block.index - 9) if block.index > 9 and block.index % 10 is not 9 else None
-
-
-# Get the left neighbour block if it exists
-def get_left(block):
-    return Block.objects.get(game=block.game, index=block.index - 1) if block.index % 10 is not 0 else None
-
-
-# Get the Right neighbour block if it exists
-def get_right(block):
-    return Block.objects.get(game=block.game, index=block.index + 1) if block.index % 10 is not 9 else None
-
-
-# Get the bottom left neighbour block if it exists
-def get_bottom_left(block):
-    return Block.objects.get(game=block.game,
-                             index=block.index + 9) if block.index < 90 and block.index % 10 is not 0 else None
-
-
-# Get the bottom center neighbour block if it exists
-def get_bottom(block):
-    return Block.objects.get(game=block.game, index=block.index + 10) if block.index < 90 else None
-
-
-# Get the bottom right neighbour block if it exists
-def get_bottom_right(block):
-    return Block.objects.get(game=block.game,
-                             index=block.index + 11) if block.index < 90 and block.index % 10 is not 9 else None
-
-
-def count_nearby_mines(block):
-    """
-    This method checks how many neighbouring blocks are mines
-    :param block: Block obj
-    :return: number of Neighbouring mine blocks - int
-    """
-    count = 0
-
-    # 1. Check top left
-    top_left = get_top_left(block)
-    if hasattr(top_left, 'is_mine') and top_left.is_mine:
-        count = count + 1
-
-    # 2. Check top center
-    top = get_top(block)
-    if hasattr(top, 'is_mine') and top.is_mine:
-        count = count + 1
+        game = board.game
+
+        # The first flip places the mines, so it is never a mine or next to one
+        if is_flipped and not game.mines_placed:
+            board.place_mines(game.mine_count, index)
+        board.update(index, is_flipped, is_flagged)
+
+        # If the block is flipped, start the sweep
+        revealed = []
+        if board.flipped[index]:
+            revealed = self.sweep(board, index)
+
+        # Set the game to lost if it's a mine
+        fields = []
+        if board.flipped[index] and board.mines[index] and not game.has_lost:
+            game.has_lost = True
+            fields.append('has_lost')
+
+        # If block is flagged, check if the user won (from the counters, no query needed)
+        if board.flagged[index] and game.has_won != game.all_mines_flagged():
+            game.has_won = not game.has_won
+            fields.append('has_won')
+        return fields, revealed
 
-    # 3. Check top right
-    top_right = get_top_right(block)
-    if hasattr(top_right, 'is_mine') and top_right.is_mine:
-        count = count + 1
-
-    # 4. Check left
-    left = get_left(block)
-    if hasattr(left, 'is_mine') and left.is_mine:
-        count = count + 1
-
-    # 5. Check right
-    right = get_right(block)
-    if hasattr(right, 'is_mine') and right.is_mine:
-        count = count + 1
-
-    # 6. Check bottom left
-    bottom_left = get_bottom_left(block)
-    if hasattr(bottom_left, 'is_mine') and bottom_left.is_mine:
-        count = count + 1
-
-    # 7. Check bottom center
-    bottom = get_bottom(block)
-    if hasattr(bottom, 'is_mine') and bottom.is_mine:
-        count = count + 1
-
-    # 8. Check bottom right
-    bottom_right = get_bottom_right(block)
-    if hasattr(bottom_right, 'is_mine') and bottom_right.is_mine:
-        count = count + 1
-
-    # Return the result
-    return count
-
-
-def check_no_mines(block):
-    """
-    This method checks if there are no nearby mines
-    :param block: Block obj
-    :return: true if no mines are near, false otherwise
-    """
-    # Make sure this block is not a mine
-    if block.is_mine:
-        return False
-
-    # Get the top neighbours
-    top_left = get_top_left(block)
-    top = get_top(block)
-    top_right = get_top_right(block)
-
-    # Check if the top neighbours are not mines
-    if (hasattr(top_left, 'is_mine') and top_left.is_mine) or (hasattr(top, 'is_mine') and top.is_mine) or (
-            hasattr(top_right, 'is_mine') and top_right.is_mine):
-        return False
-
-    # Get the side neighbours
-    left = get_left(block)
-    right = get_right(block)
-
-    # Check if the side neighbours are not mines
-    if (hasattr(left, 'is_mine') and left.is_mine) or (hasattr(right, 'is_mine') and right.is_mine):
-        return False
-
-    # Get the bottom neighbours
-    bottom_left = get_bottom_left(block)
-    bottom = get_bottom(block)
-    bottom_right = get_bottom_right(block)
-
-    # Check if the bottom neighbours are not mines
-    if (hasattr(bottom_left, 'is_mine') and bottom_left.is_mine) or (hasattr(bottom, 'is_mine') and bottom.is_mine) or (
-            hasattr(bottom_right, 'is_mine') and bottom_right.is_mine):
-        return False
-
-    # If all pass, this tile has no nearby neighbours
-    return True
-
-
-class Sweeper:
     def breadth_first_sweep(self, first_block):
         """
-        This function does a breadth first search of (right angle) adjacent blocks with no nearby mines
+        This function loads the board once, sweeps it in memory and saves only the flipped blocks
         :param first_block: Block obj
-        :return: void
+        :return: indexes of the blocks the sweep flipped - list
         """
-        # Put the first block into the queue
-        q = BlockQueue()
-        q.enqueue_unique(first_block)
-
-        # Keep filling the queue with 0 blocks
-        while not q.is_empty():
-            block = q.dequeue()
-
-            # Check if the block has no nearby mines
-            if check_no_mines(block):
-                block.is_flipped = True
-                block.save()
-
-                # Flip then try enqueueing the top block
-                temp = get_top(block)
-                if temp is not None:
-                    if check_no_mines(temp):
-                        q.enqueue_unique(temp)
-                    temp.is_flipped = True
-                    temp.save()
-
-                # Flip then try enqueueing the bottom block
-                temp = get_bottom(block)
-                if temp is not None:
-                    if check_no_mines(temp):
-                        q.enqueue_unique(temp)
-                    temp.is_flipped = True
-                    temp.save()
-
-                # Flip then try enqueueing the left block
-                temp = get_left(block)
-                if temp is not None:
-                    if check_no_mines(temp):
-                        q.enqueue_unique(temp)
-                    temp.is_flipped = True
-                    temp.save()
-
-                # Flip then try enqueueing the right  block
-                temp = get_right(block)
-                if temp is not None:
-                    if check_no_mines(temp):
-                        q.enqueue_unique(temp)
-                    temp.is_flipped = True
-                    temp.save()
-
-                # Simply flip the corners
-                for c in [get_top_left(block), get_top_right(block), get_bottom_left(block), get_bottom_right(block)]:
-                    if c is not None:
-                        c.is_flipped = True
-                        c.save()
+        board = Board.load(first_block.game)
+        revealed = self.sweep(board, first_block.index)
+        board.save()
+        return revealed
 
 
 sweeper = Sweeper()
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+
+from django.test import TransactionTestCase
+from rest_framework.utils import json
+
+from games.board import create_game
+from games.models import Game, Block
+from server.asgi import application
+from server.asgi_bridge import WsgiToAsgi
+
+
+class AsgiTestCase(TransactionTestCase):
+    """
+    This Test Case is for serving the games API through the ASGI application
+    """
+
+    def setUp(self):
+        """
+        In set up, create a game with one mine in the bottom right corner
+        """
+        self.game = create_game(mines=[99])
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def request(self, method, path, body=b''):
+        # Run one request through the ASGI application, collecting what it sends back
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'testserver'), (b'content-type', b'application/json'),
+                        (b'content-length', str(len(body)).encode())],
+        }
+        sent = []
+        chunks = [body[:5], body[5:]]
+
+        async def receive():
+            # Once the body is read the client stays connected
+            if not chunks:
+                await asyncio.Event().wait()
+            chunk = chunks.pop(0)
+            return {'type': 'http.request', 'body': chunk, 'more_body': bool(chunks)}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(application(scope, receive, send))
+        return sent
+
+    def endless_application(self, closed):
+        # A WSGI application streaming forever, until its response is closed
+        class Stream:
+            def __iter__(self):
+                while True:
+                    time.sleep(0.005)
+                    yield b'.'
+
+            def close(self):
+                closed.set()
+
+        def wsgi_application(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return Stream()
+        return wsgi_application
+
+    def test_get_game(self):
+        # The response starts with the status and headers, then the body
+        sent = self.request('GET', '/games/' + str(self.game.id) + '/')
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'application/json'), sent[0]['headers'])
+        self.assertFalse(sent[-1]['more_body'])
+
+        # The body is the same state the WSGI application serves
+        data = json.loads(b''.join(message.get('body', b'') for message in sent[1:]))
+        self.assertEqual(data['id'], self.game.id)
+        self.assertEqual(len(data['blocks']), 100)
+
+    def test_post_game(self):
+        # A request body sent in several messages reaches the view whole
+        sent = self.request('POST', '/games/', json.dumps({'difficulty': 'beginner'}).encode())
+        self.assertEqual(sent[0]['status'], 200)
+        data = json.loads(b''.join(message.get('body', b'') for message in sent[1:]))
+        self.assertEqual((data['width'], data['height']), (9, 9))
+
+    def test_lifespan(self):
+        # Startup and shutdown are acknowledged
+        events = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return events.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(application({'type': 'lifespan'}, receive, send))
+        self.assertEqual([message['type'] for message in sent],
+                         ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+    def test_disconnect_closes_the_response(self):
+        closed = threading.Event()
+        bridge = WsgiToAsgi(self.endless_application(closed), max_workers=1)
+        messages = [{'type': 'http.request', 'body': b''}]
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(0.05)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            pass
+
+        asyncio.run(bridge({'type': 'http', 'method': 'GET', 'path': '/'}, receive, send))
+
+        # The pool thread stopped streaming and is free for the next request
+        self.assertTrue(closed.wait(1))
+        self.assertEqual(bridge.executor.submit(lambda: 'free').result(timeout=1), 'free')
+
+    def test_cancelled_request_closes_the_response(self):
+        closed = threading.Event()
+        bridge = WsgiToAsgi(self.endless_application(closed), max_workers=1)
+        messages = [{'type': 'http.request', 'body': b''}]
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.Event().wait()
+
+        async def send(message):
+            pass
+
+        async def cancel_request():
+            # The server cancels the request task when the client goes away
+            task = asyncio.ensure_future(bridge({'type': 'http', 'method': 'GET', 'path': '/'}, receive, send))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        asyncio.run(cancel_request())
+        self.assertTrue(closed.wait(1))
+        self.assertEqual(bridge.executor.submit(lambda: 'free').result(timeout=1), 'free')
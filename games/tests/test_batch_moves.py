@@ -0,0 +1,68 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, APIRequestFactory
+from rest_framework.utils import json
+
+from games.views import GameMoves
+from games.board import create_game
+from games.models import Game, Block
+
+
+class BatchMovesTestCase(APITestCase):
+    """
+    This Test Case is for playing many moves in one request
+    """
+
+    def setUp(self):
+        """
+        In set up, create a game with mines in the bottom corners
+        """
+        self.game = create_game(mines=[90, 99])
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def post_moves(self, moves):
+        # Post a batch of moves
+        url = '/games/' + str(self.game.pk) + '/moves/'
+        factory = APIRequestFactory()
+        view = GameMoves.as_view()
+        request = factory.post(url, data=json.dumps({'moves': moves}), content_type='application/json')
+        return view(request, game_id=self.game.pk)
+
+    def test_flag_every_mine_in_one_batch_to_win(self):
+        moves = [{'index': 90, 'action': 'flag'}, {'index': 5, 'action': 'flag'},
+                 {'index': 5, 'action': 'unflag'}, {'index': 99, 'action': 'flag'}]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_moves(moves)
+
+        # Assert the response was okay and the game is won
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data.get('has_won'))
+        self.assertEqual(response.data.get('flags_left'), 0)
+        self.assertFalse(Block.objects.get(game=self.game, index=5).is_flagged)
+
+        # One board load and one write of each kind, whatever the number of moves
+        self.assertLessEqual(len(queries), 10)
+
+    def test_flip_and_sweep_in_a_batch(self):
+        response = self.post_moves([{'index': 0, 'action': 'flip'}, {'index': 90, 'action': 'flip'}])
+
+        # Assert the sweep happened and the second move lost the game
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data.get('has_lost'))
+        self.assertEqual(Block.objects.filter(game=self.game, is_flipped=True).count(), 99)
+
+    def test_bad_batch_plays_nothing(self):
+        response = self.post_moves([{'index': 0, 'action': 'flip'}, {'index': 100, 'action': 'flag'}])
+        self.assertEqual(response.status_code, 400)
+
+        response = self.post_moves([{'index': 0, 'action': 'dig'}])
+        self.assertEqual(response.status_code, 400)
+
+        # Assert nothing changed
+        self.assertEqual(Block.objects.filter(game=self.game, is_flipped=True).count(), 0)
@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from rest_framework.test import APITestCase
+
+from games.models import Game, Block
+
+
+class BenchmarkGamesTestCase(APITestCase):
+    """
+    This Test Case is for the games benchmark command and its baseline
+    """
+
+    def setUp(self):
+        self.baseline = os.path.join(tempfile.mkdtemp(), 'games.json')
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def benchmark(self, *args):
+        out = StringIO()
+        call_command('benchmark_games', '--iterations', '2', '--baseline', self.baseline, *args, stdout=out)
+        return out.getvalue()
+
+    def test_saves_and_compares_a_baseline(self):
+        self.assertIn('Baseline written', self.benchmark('--save-baseline', '--scenarios', 'flag', 'big_sweep'))
+        with open(self.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        self.assertEqual(sorted(baseline), ['big_sweep', 'flag'])
+        queries = baseline['flag']['queries']
+        self.assertGreater(queries, 0)
+
+        # The benchmark games are deleted afterwards
+        self.assertEqual(Game.objects.count(), 0)
+
+        # Any extra query is a regression
+        baseline['flag']['queries'] = queries - 1
+        with open(self.baseline, 'w') as baseline_file:
+            json.dump(baseline, baseline_file)
+        message = 'flag queries: %.2f, baseline %.2f' % (queries, queries - 1)
+        with self.assertRaisesMessage(CommandError, message):
+            self.benchmark('--scenarios', 'flag', '--threshold', '100')
+
+    def test_unknown_scenario(self):
+        with self.assertRaisesMessage(CommandError, 'Unknown scenarios: nope'):
+            self.benchmark('--scenarios', 'nope')
@@ -0,0 +1,43 @@
+from django.db import IntegrityError, connection, transaction
+from rest_framework.test import APITestCase
+
+from games.board import create_game
+from games.models import Game, Block
+
+
+class BlockIndexesTestCase(APITestCase):
+    """
+    This Test Case is for the Block indexes and constraints
+    """
+
+    def setUp(self):
+        """
+        In set up, create a game and make the last block a mine
+        """
+        self.game = create_game(mines=[99])
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def test_blocks_come_in_board_order_from_the_index(self):
+        blocks = Block.objects.filter(game=self.game)
+        self.assertEqual([block.index for block in blocks], list(range(100)))
+
+        # The (game, index) index gives the order, no sort is needed
+        plan = blocks.explain()
+        self.assertIn('USING INDEX', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_partial_indexes_exist(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Block._meta.db_table)
+        self.assertTrue(constraints['block_game_mine_idx']['index'])
+        self.assertTrue(constraints['block_game_flag_idx']['index'])
+
+    def test_one_block_per_index(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Block.objects.create(game=self.game, index=5)
@@ -0,0 +1,141 @@
+import random
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from games.board import Board, convolve_mines, create_game
+from games.models import Game, Block
+from games.sweeper import sweeper
+
+
+class BoardTestCase(APITestCase):
+    """
+    This Test Case is for the in memory board engine
+    """
+
+    def setUp(self):
+        """
+        In set up, create a game and make the last block a mine (the BigSweep layout)
+        """
+        self.game = create_game(mines=[99])
+        self.last_block = Block.objects.get(game=self.game, index=99)
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def test_neighbours_respect_the_edges(self):
+        board = Board.load(self.game)
+
+        # Corners only have three neighbours
+        self.assertEqual(sorted(board.neighbours(0)), [1, 10, 11])
+        self.assertEqual(sorted(board.neighbours(99)), [88, 89, 98])
+
+        # Edges do not wrap around to the next row
+        self.assertEqual(sorted(board.neighbours(10)), [0, 1, 11, 20, 21])
+        self.assertEqual(sorted(board.neighbours(19)), [8, 9, 18, 28, 29])
+
+    def test_count_and_check_nearby_mines(self):
+        board = Board.load(self.game)
+        self.assertEqual(board.nearby[88], 1)
+        self.assertEqual(board.nearby[0], 0)
+        self.assertFalse(board.check_no_mines(89))
+        self.assertFalse(board.check_no_mines(99))
+        self.assertTrue(board.check_no_mines(0))
+
+    def test_big_sweep_uses_a_constant_number_of_queries(self):
+        block = Block.objects.select_related('game').get(game=self.game, index=0)
+
+        # Load once, one UPDATE for the blocks (every changed block is flipped) and one for the game counters
+        with CaptureQueriesContext(connection) as queries:
+            sweeper.breadth_first_sweep(block)
+        self.assertEqual(len(queries), 3)
+
+        # Everything but the mine is flipped
+        self.assertEqual(Block.objects.filter(game=self.game, is_flipped=True).count(), 99)
+        self.assertFalse(Block.objects.get(game=self.game, index=99).is_flipped)
+
+    def test_create_game_places_mines_and_counts_in_one_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            game = create_game(mines=[0, 11])
+
+        # A single bulk insert for all the blocks
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "games_block"')]
+        self.assertEqual(len(inserts), 1)
+
+        # Mines and nearby mines are written with the blocks
+        board = Board.load(game)
+        self.assertEqual(Block.objects.filter(game=game).count(), 100)
+        self.assertEqual(board.mines.count(1), 2)
+        self.assertEqual(board.nearby[1], 2)
+        self.assertEqual(board.nearby[22], 1)
+        self.assertEqual(game.flags_left, 2)
+
+    def test_convolution_matches_neighbour_counting(self):
+        board = Board.generate(mines=[0, 9, 44, 45, 54, 90, 99])
+        expected = [sum(board.mines[n] for n in board.neighbours(index)) for index in range(len(board))]
+        self.assertEqual(list(convolve_mines(board.mines, 10, 10)), expected)
+        self.assertEqual(list(board.nearby), expected)
+
+    def test_neighbours_match_the_grid(self):
+        board = Board(width=7, height=4)
+        for index in range(len(board)):
+            row, col = divmod(index, 7)
+            around = {(r, c) for r in range(row - 1, row + 2) for c in range(col - 1, col + 2)
+                      if (r, c) != (row, col) and 0 <= r < 4 and 0 <= c < 7}
+            self.assertEqual({divmod(n, 7) for n in board.neighbours(index)}, around)
+
+    def test_block_saves_do_not_recount_neighbours(self):
+        block = Block.objects.get(game=self.game, index=0)
+        block.is_flagged = True
+
+        # A plain UPDATE with no signal queries behind it
+        with CaptureQueriesContext(connection) as queries:
+            block.save()
+        self.assertEqual(len(queries), 1)
+
+    def test_counters_follow_flips_and_flags(self):
+        self.assertEqual((self.game.flags_placed, self.game.mines_flagged, self.game.safe_hidden), (0, 0, 99))
+
+        # Flag the mine and a safe block
+        board = Board.load(self.game)
+        board.update(99, is_flagged=True)
+        board.update(0, is_flagged=True)
+        board.save()
+
+        # Flipping the flagged safe block takes its flag off the count
+        board.flip(0)
+        board.save()
+
+        game = Game.objects.get(pk=self.game.pk)
+        self.assertEqual((game.flags_placed, game.mines_flagged, game.safe_hidden), (1, 1, 98))
+        self.assertEqual(game.flags_left, 0)
+        self.assertTrue(game.all_mines_flagged())
+
+    def test_sweep_matches_block_by_block_flood_fill(self):
+        random.seed(7)
+        for _ in range(20):
+            board = Board.generate(mines=random.sample(range(150), 20), width=15, height=10)
+            board.flipped[random.randrange(150)] = 1
+            start = next(index for index in range(150) if board.check_no_mines(index))
+
+            # Open every zero block joined through its sides, then all eight neighbours of each of them
+            expected, queue = set(), [start]
+            seen = {start}
+            while queue:
+                index = queue.pop()
+                expected.update([index] + board.neighbours(index))
+                for neighbour in board.neighbours(index):
+                    if abs(neighbour - index) in (1, 15) and board.check_no_mines(neighbour) and neighbour not in seen:
+                        seen.add(neighbour)
+                        queue.append(neighbour)
+            expected = sorted(index for index in expected if not board.flipped[index])
+
+            safe_hidden = board.counters()['safe_hidden']
+            self.assertEqual(sweeper.sweep(board, start), expected)
+            self.assertEqual(board.changed, set(expected))
+            self.assertEqual(board.deltas['safe_hidden'], board.counters()['safe_hidden'] - safe_hidden)
@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIRequestFactory
+
+from games.views import Games, GameDetails, PoolStats
+from games.models import Game, Block
+from games.pool import board_pool
+
+# A small pool of beginner boards, refilled in the test itself
+SMALL_POOL = {
+    'CONFIGURATIONS': [(9, 9, 10)],
+    'LOW_WATERMARK': 2,
+    'HIGH_WATERMARK': 4,
+    'REFILL_IN_BACKGROUND': False,
+}
+
+
+@override_settings(GAMES_BOARD_POOL=SMALL_POOL)
+class BoardPoolTestCase(APITestCase):
+    """
+    This Test Case is for claiming new games from the pool of ready made boards
+    """
+
+    def setUp(self):
+        """
+        In set up, fill the pool
+        """
+        board_pool.refill()
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def post_game(self, data):
+        # Post a new game
+        factory = APIRequestFactory()
+        view = Games.as_view()
+        request = factory.post('/games/', data=data, format='json')
+        return view(request)
+
+    def test_refill_fills_up_to_the_high_watermark(self):
+        self.assertEqual(Game.objects.filter(is_pooled=True, width=9, height=9, mine_count=10).count(), 4)
+        self.assertEqual(Block.objects.count(), 4 * 81)
+
+        # A full pool is left alone
+        self.assertEqual(board_pool.refill(), 0)
+
+    def test_new_game_is_claimed_from_the_pool(self):
+        pooled = Game.objects.get(pk=Game.objects.filter(is_pooled=True).order_by('pk')[0].pk)
+        response = self.post_game({'difficulty': 'beginner'})
+        self.assertEqual(response.status_code, 200)
+
+        # The oldest pooled board became the new game, without making another one
+        self.assertEqual(response.data['id'], pooled.pk)
+        game = Game.objects.get(pk=pooled.pk)
+        self.assertFalse(game.is_pooled)
+        self.assertGreater(game.created_at, pooled.created_at)
+        self.assertEqual(Game.objects.count(), 4)
+        self.assertEqual(Game.objects.filter(is_pooled=True).count(), 3)
+
+    def test_low_pool_asks_for_a_refill(self):
+        # Claims leaving 3 and 2 boards keep the pool at the low watermark, the one leaving 1 goes below it
+        with mock.patch.object(board_pool, 'request_refill') as request_refill:
+            self.post_game({'difficulty': 'beginner'})
+            self.post_game({'difficulty': 'beginner'})
+            request_refill.assert_not_called()
+            self.post_game({'difficulty': 'beginner'})
+            request_refill.assert_called_once_with()
+
+    def test_other_configurations_are_generated(self):
+        response = self.post_game({'difficulty': 'expert'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Game.objects.filter(is_pooled=True).count(), 4)
+        self.assertEqual(Game.objects.get(pk=response.data['id']).mine_count, 99)
+
+    def test_empty_pool_falls_back_to_a_new_board(self):
+        Game.objects.filter(is_pooled=True).delete()
+        response = self.post_game({'difficulty': 'beginner'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Game.objects.get(pk=response.data['id']).mine_count, 10)
+
+    def test_pooled_boards_are_hidden(self):
+        pooled = Game.objects.filter(is_pooled=True).first()
+        factory = APIRequestFactory()
+        view = GameDetails.as_view()
+        request = factory.get('/games/' + str(pooled.pk) + '/')
+        self.assertEqual(view(request, game_id=pooled.pk).status_code, 404)
+
+    def test_pool_stats(self):
+        self.post_game({'difficulty': 'beginner'})
+        factory = APIRequestFactory()
+        view = PoolStats.as_view()
+        response = view(factory.get('/games/pool_stats/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['depth'], [{'width': 9, 'height': 9, 'mines': 10, 'boards': 3}])
+        self.assertGreaterEqual(response.data['claims'], 1)
@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.db import OperationalError, connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIRequestFactory
+from rest_framework.utils import json
+
+from games.views import BlockDetails
+from games.board import Board, create_game
+from games.models import Game, Block
+
+
+class ConcurrentMovesTestCase(TransactionTestCase):
+    """
+    This Test Case is for many moves on the same game at the same time
+    """
+
+    def setUp(self):
+        """
+        In set up, create a game with a column of mines in the middle of the board
+        """
+        self.mines = list(range(5, 100, 10))
+        self.game = create_game(mines=self.mines)
+        self.block_ids = dict(Block.objects.filter(game=self.game).values_list('index', 'pk'))
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def patch_block(self, index, data):
+        # Patch a block from a worker thread, with its own connection
+        try:
+            url = '/games/blocks/' + str(self.block_ids[index]) + '/'
+            factory = APIRequestFactory()
+            view = BlockDetails.as_view()
+            request = factory.patch(url, data=json.dumps(data), content_type='application/json')
+            return view(request, block_id=self.block_ids[index]).status_code
+        finally:
+            connection.close()
+
+    def test_parallel_moves_keep_the_board_consistent(self):
+        # Flag every mine, toggle flags on safe blocks and flip both sides of the board, all at once
+        moves = [(mine, {'is_flagged': True}) for mine in self.mines]
+        moves += [(index, {'is_flagged': True}) for index in range(0, 100, 10)]
+        moves += [(index, {'is_flagged': False}) for index in range(0, 100, 10)]
+        moves += [(0, {'is_flipped': True}), (9, {'is_flipped': True}), (99, {'is_flipped': True})] * 3
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            statuses = list(pool.map(lambda move: self.patch_block(*move), moves))
+        self.assertEqual(statuses, [200] * len(moves))
+
+        # The counters match a recount of the board
+        game = Game.objects.get(pk=self.game.pk)
+        board = Board.load(game)
+        counters = board.counters()
+        self.assertEqual((game.flags_placed, game.mines_flagged, game.safe_hidden),
+                         (counters['flags_placed'], counters['mines_flagged'], counters['safe_hidden']))
+
+        # Every move that changed the board made a new version
+        self.assertEqual(game.version, len(moves))
+
+        # Both sides were swept open around the mines and every mine stayed flagged
+        self.assertTrue(all(board.flipped[index] for index in range(100) if index % 10 not in (4, 5, 6)))
+        self.assertTrue(all(board.flagged[mine] for mine in self.mines))
+        self.assertTrue(game.has_won)
+        self.assertFalse(game.has_lost)
+
+    def test_locked_database_is_tried_again(self):
+        load = Board.load
+        errors = [OperationalError('database is locked')]
+
+        def load_once_locked(game):
+            if errors:
+                raise errors.pop()
+            return load(game)
+
+        with mock.patch.object(Board, 'load', side_effect=load_once_locked):
+            self.assertEqual(self.patch_block(0, {'is_flagged': True}), 200)
+        self.assertTrue(Block.objects.get(pk=self.block_ids[0]).is_flagged)
+
+    def test_other_database_errors_are_not_tried_again(self):
+        with mock.patch.object(Board, 'load', side_effect=OperationalError('no such table: games_block')) as load:
+            with self.assertRaises(OperationalError):
+                self.patch_block(0, {'is_flagged': True})
+        self.assertEqual(load.call_count, 1)
@@ -0,0 +1,64 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, APIRequestFactory
+from rest_framework.utils import json
+
+from games.views import GameDetails, BlockDetails
+from games.board import create_game
+from games.models import Game, Block
+
+
+class ConditionalGetTestCase(APITestCase):
+    """
+    This Test Case is for fetching a game with an ETag
+    """
+
+    def setUp(self):
+        """
+        In set up, create a game and make the last block a mine
+        """
+        self.game = create_game(mines=[99])
+        self.last_block = Block.objects.get(game=self.game, index=99)
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def get_game(self, **headers):
+        # Fetch the game
+        url = '/games/' + str(self.game.pk) + '/'
+        factory = APIRequestFactory()
+        view = GameDetails.as_view()
+        request = factory.get(url, content_type='application/json', **headers)
+        return view(request, game_id=self.game.pk)
+
+    def test_unchanged_game_is_not_modified(self):
+        etag = self.get_game()['ETag']
+
+        # Only the game row is read to answer 304
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_game(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('games_block', queries[0]['sql'])
+
+    def test_a_move_changes_the_etag(self):
+        etag = self.get_game()['ETag']
+
+        # Flag the only mine
+        url = '/games/blocks/' + str(self.last_block.pk) + '/'
+        factory = APIRequestFactory()
+        view = BlockDetails.as_view()
+        request = factory.patch(url, data=json.dumps({'is_flagged': True}), content_type='application/json')
+        view(request, block_id=self.last_block.pk)
+
+        # The old ETag no longer matches
+        response = self.get_game(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertTrue(response.data.get('has_won'))
+        self.assertEqual(Game.objects.get(pk=self.game.pk).version, 1)
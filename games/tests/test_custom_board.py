@@ -0,0 +1,97 @@
+from rest_framework.test import APITestCase, APIRequestFactory
+
+from games.views import Games, GameMoves
+from games.board import Board, create_game
+from games.models import Game, Block
+from games.storage import packed_block_id
+from games.sweeper import sweeper
+
+
+class CustomBoardTestCase(APITestCase):
+    """
+    This Test Case is for games with a difficulty or a custom size
+    """
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def post_game(self, data):
+        # Post a new Game
+        url = '/games/'
+        factory = APIRequestFactory()
+        view = Games.as_view()
+        request = factory.post(url, data=data, format='json')
+        return view(request)
+
+    def test_post_expert_game(self):
+        response = self.post_game({'difficulty': 'expert'})
+        self.assertEqual(response.status_code, 200)
+
+        # Assert the board has the expert size and mines
+        game = Game.objects.get(pk=response.data.get('id'))
+        self.assertEqual((game.width, game.height, game.mine_count), (30, 16, 99))
+        self.assertEqual(len(response.data.get('blocks')), 30 * 16)
+        self.assertFalse(game.mines_placed)
+        self.assertEqual(response.data.get('flags_left'), 99)
+
+    def test_post_large_custom_game_is_packed(self):
+        response = self.post_game({'width': 200, 'height': 150, 'mines': 4000})
+        self.assertEqual(response.status_code, 200)
+
+        # Assert the board lives in the game row
+        game = Game.objects.get(pk=response.data.get('id'))
+        self.assertTrue(game.is_packed)
+        self.assertEqual(Block.objects.count(), 0)
+        self.assertEqual(game.mine_count, 4000)
+        self.assertEqual(sum(Board.load(game).mines), 0)
+
+    def test_large_board_state_is_compact(self):
+        response = self.post_game({'width': 200, 'height': 150, 'mines': 4000})
+        game_id = response.data.get('id')
+
+        # One character per block instead of a dict per block
+        self.assertNotIn('blocks', response.data)
+        self.assertEqual(response.data.get('blocks_state'), '0' * 30000)
+        self.assertEqual(response.data.get('blocks_shown'), '-' * 30000)
+        self.assertEqual(response.data.get('first_block_id'), packed_block_id(game_id, 0))
+
+        # Moves answer with only their changes unless the full state is asked for
+        factory = APIRequestFactory()
+        request = factory.post('/games/' + str(game_id) + '/moves/', data={'moves': [
+            {'index': 0, 'action': 'flip'}]}, format='json')
+        response = GameMoves.as_view()(request, game_id=game_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('revealed', response.data)
+
+        request = factory.post('/games/' + str(game_id) + '/moves/?delta=false', data={'moves': [
+            {'index': 1, 'action': 'flag'}]}, format='json')
+        response = GameMoves.as_view()(request, game_id=game_id)
+        state, shown = response.data.get('blocks_state'), response.data.get('blocks_shown')
+        board = Board.load(Game.objects.get(pk=game_id))
+        self.assertEqual(state[0], '1')
+        self.assertEqual(shown[0], str(board.nearby[0]))
+        self.assertEqual(state.count('1') + state.count('3'), sum(board.flipped))
+
+    def test_post_too_many_mines(self):
+        response = self.post_game({'width': 5, 'height': 5, 'mines': 25})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Game.objects.count(), 0)
+
+    def test_sweep_wide_board(self):
+        # A 30 by 5 board with a mine in the bottom right corner
+        game = create_game(mines=[149], width=30, height=5)
+        board = Board.load(game)
+        self.assertEqual(sorted(board.neighbours(29)), [28, 58, 59])
+        self.assertEqual(board.nearby[118], 1)
+
+        # Sweeping from the top left flips everything but the mine
+        sweeper.sweep(board, 0)
+        self.assertEqual(board.flipped.count(1), 149)
+        self.assertFalse(board.flipped[149])
@@ -0,0 +1,67 @@
+from rest_framework.test import APITestCase, APIRequestFactory
+from rest_framework.utils import json
+
+from games.views import BlockDetails
+from games.board import create_game
+from games.models import Game, Block
+
+
+class DeltaResponseTestCase(APITestCase):
+    """
+    This Test Case is for responses with only the blocks a move changed
+    """
+
+    def setUp(self):
+        """
+        In set up, create a game and make the last block a mine
+        """
+        self.game = create_game(mines=[99])
+        self.first_block = Block.objects.get(game=self.game, index=0)
+        self.last_block = Block.objects.get(game=self.game, index=99)
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def patch_block(self, block, data, url_suffix='?delta=true', **headers):
+        # Patch a block asking for a delta
+        url = '/games/blocks/' + str(block.pk) + '/' + url_suffix
+        factory = APIRequestFactory()
+        view = BlockDetails.as_view()
+        request = factory.patch(url, data=json.dumps(data), content_type='application/json', **headers)
+        return view(request, block_id=block.pk)
+
+    def test_flag_returns_only_the_flagged_block(self):
+        response = self.patch_block(self.last_block, {'is_flagged': True})
+
+        # Assert the response was okay and only holds the changed block
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data.get('blocks'), [{'index': 99, 'is_flipped': False, 'is_flagged': True}])
+        self.assertEqual(response.data.get('revealed'), [])
+        self.assertTrue(response.data.get('has_won'))
+        self.assertEqual(response.data.get('flags_left'), 0)
+
+    def test_sweep_is_reported_as_runs(self):
+        response = self.patch_block(self.first_block, {'is_flipped': True}, url_suffix='', HTTP_X_BOARD_DELTA='1')
+        self.assertEqual(response.status_code, 200)
+
+        # The clicked block is listed and the rest of the board comes as one run
+        self.assertEqual(response.data.get('blocks'), [
+            {'index': 0, 'is_flipped': True, 'is_flagged': False, 'is_mine': False, 'nearby_mines': 0}])
+        self.assertEqual(response.data.get('revealed'), [[1, 99]])
+        nearby = response.data.get('revealed_nearby_mines')
+        self.assertEqual(len(nearby), 98)
+        self.assertEqual(nearby[88 - 1], '1')
+
+    def test_losing_shows_every_mine(self):
+        response = self.patch_block(self.last_block, {'is_flipped': True})
+        self.assertTrue(response.data.get('has_lost'))
+        self.assertEqual(response.data.get('mines'), [99])
+
+    def test_full_state_without_delta(self):
+        response = self.patch_block(self.last_block, {'is_flagged': True}, url_suffix='')
+        self.assertEqual(len(response.data.get('blocks')), 100)
+        self.assertNotIn('revealed', response.data)
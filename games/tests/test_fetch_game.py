@@ -1,6 +1,9 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase, APIRequestFactory
 
 from games.views import Games, GameDetails
+from games.board import create_game
 from games.models import Game, Block
 
 from games.constants import NUMBER_OF_MINES, NUMBER_OF_BLOCKS
@@ -47,9 +50,11 @@ class GamePostTestCase(APITestCase):
         self.assertEqual(len(Game.objects.all()), 1)
         self.assertEqual(len(Block.objects.all()), NUMBER_OF_BLOCKS)
 
-        # Assert there are NUMBER_OF_MINES mines in the game
+        # Assert the game will have NUMBER_OF_MINES mines, placed on the first flip
         game = Game.objects.first()
-        self.assertEqual(len(Block.objects.filter(game=game, is_mine=True)), NUMBER_OF_MINES)
+        self.assertEqual(game.mine_count, NUMBER_OF_MINES)
+        self.assertFalse(game.mines_placed)
+        self.assertEqual(len(Block.objects.filter(game=game, is_mine=True)), 0)
 
         # Assert the blocks are PRIVATE (i.e. no mine data)
         first_block = response.data.get('blocks')[0]
@@ -60,3 +65,23 @@ class GamePostTestCase(APITestCase):
         self.assertFalse(response.data.get('has_won'))
         self.assertFalse(response.data.get('has_lost'))
         self.assertEqual(response.data.get('flags_left'), NUMBER_OF_MINES)
+
+    def test_fetch_game_is_a_single_read(self):
+        game = create_game(mines=[99])
+
+        # Fetch the game
+        url = '/games/' + str(game.pk) + '/'
+        factory = APIRequestFactory()
+        view = GameDetails.as_view()
+        request = factory.get(url, content_type='application/json')
+
+        # One query for the game and one for its blocks, nothing written
+        with CaptureQueriesContext(connection) as queries:
+            response = view(request, game_id=game.pk)
+        self.assertEqual(len(queries), 2)
+        self.assertTrue(all(q['sql'].startswith('SELECT') for q in queries))
+
+        # Assert the state is intact
+        self.assertEqual(len(response.data.get('blocks')), NUMBER_OF_BLOCKS)
+        self.assertEqual(response.data.get('flags_left'), 1)
+        self.assertNotIn('is_mine', response.data.get('blocks')[99])
@@ -0,0 +1,76 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, APIRequestFactory
+from rest_framework.utils import json
+
+from games.views import BigSweep, BlockDetails, LoserGame, WinnerGame
+from games.models import Game, Block
+
+from games.constants import NUMBER_OF_MINES, MAX_FIXTURE_GAMES
+
+
+class FixtureGamesTestCase(APITestCase):
+    """
+    This Test Case is for the winner, loser and big sweep fixtures of the automation tests
+    """
+
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def post_fixture(self, view_class, url, data=None):
+        # Ask for fixture games
+        factory = APIRequestFactory()
+        request = factory.post(url, data=data, format='json')
+        return view_class.as_view()(request)
+
+    def test_winner(self):
+        response = self.post_fixture(WinnerGame, '/games/winner/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data.get('has_won'))
+        self.assertEqual(response.data.get('flags_left'), 0)
+
+        # The game is a test with its mines flagged
+        game = Game.objects.get(pk=response.data.get('id'))
+        self.assertTrue(game.is_test)
+        self.assertTrue(game.all_mines_flagged())
+        self.assertEqual(Block.objects.filter(game=game, is_mine=True, is_flagged=True).count(), NUMBER_OF_MINES)
+
+    def test_many_losers_in_one_request(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_fixture(LoserGame, '/games/loser/', {'count': 20})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['games']), 20)
+        self.assertTrue(all(game['has_lost'] for game in response.data['games']))
+
+        # One INSERT per game, the blocks of all 20 in one bulk insert (split by SQLite in batches of 166 blocks),
+        # one read of their ids and a savepoint
+        self.assertLessEqual(len(queries), 20 + 2000 // 166 + 1 + 1 + 2)
+        self.assertEqual(Game.objects.filter(is_test=True, has_lost=True).count(), 20)
+        self.assertEqual(Block.objects.count(), 20 * 100)
+        self.assertFalse(Block.objects.filter(index=99, is_flipped=True).exists())
+
+    def test_big_sweep_block_ids(self):
+        response = self.post_fixture(BigSweep, '/games/big_sweep/?count=2')
+        first, second = response.data['games']
+        self.assertEqual(Block.objects.get(pk=second['blocks'][5]['id']).index, 5)
+
+        # Flipping the first block of a returned game sweeps its board
+        block_id = first['blocks'][0]['id']
+        factory = APIRequestFactory()
+        request = factory.patch('/games/blocks/' + str(block_id) + '/', data=json.dumps({'is_flipped': True}),
+                                content_type='application/json')
+        response = BlockDetails.as_view()(request, block_id=block_id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Block.objects.filter(game_id=first['id'], is_flipped=True).count(), 99)
+
+    def test_count_is_limited(self):
+        response = self.post_fixture(WinnerGame, '/games/winner/', {'count': MAX_FIXTURE_GAMES + 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Game.objects.count(), 0)
@@ -0,0 +1,151 @@
+from unittest import mock
+
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.test import override_settings
+from rest_framework.test import APITestCase, APIRequestFactory
+from rest_framework.utils import json
+
+from games import events
+from games.views import BlockDetails, GameEvents
+from games.board import create_game
+from games.models import Game, Block
+
+
+def parse_event(chunk):
+    # Split a Server-Sent Event into its fields
+    fields = dict(line.split(': ', 1) for line in chunk.decode().strip().split('\n'))
+    fields['data'] = json.loads(fields['data'])
+    return fields
+
+
+def close_stream(response):
+    # Close a response like the server does, keeping the test database connection open
+    request_finished.disconnect(close_old_connections)
+    try:
+        response.close()
+    finally:
+        request_finished.connect(close_old_connections)
+
+
+class GameEventsTestCase(APITestCase):
+    """
+    This Test Case is for pushing the moves of a game to its event streams
+    """
+
+    def setUp(self):
+        """
+        In set up, create a game and make the last block a mine
+        """
+        self.game = create_game(mines=[99])
+        self.first_block = Block.objects.get(game=self.game, index=0)
+        self.last_block = Block.objects.get(game=self.game, index=99)
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def open_stream(self, game_id):
+        # Open the event stream of a game
+        factory = APIRequestFactory()
+        view = GameEvents.as_view()
+        request = factory.get('/games/' + str(game_id) + '/events/')
+        return view(request, game_id=game_id)
+
+    def patch_block(self, block, data):
+        # Play a move on a block
+        factory = APIRequestFactory()
+        view = BlockDetails.as_view()
+        request = factory.patch('/games/blocks/' + str(block.pk) + '/', data=json.dumps(data),
+                                content_type='application/json')
+        return view(request, block_id=block.pk)
+
+    def test_stream_starts_with_the_state(self):
+        response = self.open_stream(self.game.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        event = parse_event(next(response.streaming_content))
+        self.assertEqual(event['event'], 'state')
+        self.assertEqual(event['id'], '0')
+        self.assertEqual(len(event['data']['blocks']), 100)
+        close_stream(response)
+
+    def test_moves_are_pushed(self):
+        response = self.open_stream(self.game.id)
+        next(response.streaming_content)
+
+        # A flag comes through as the changed block and the counters
+        self.assertEqual(self.patch_block(self.first_block, {'is_flagged': True}).status_code, 200)
+        event = parse_event(next(response.streaming_content))
+        self.assertEqual(event['event'], 'move')
+        self.assertEqual(event['id'], '1')
+        self.assertEqual(event['data']['blocks'], [{'index': 0, 'is_flipped': False, 'is_flagged': True}])
+        self.assertEqual(event['data']['flags_left'], 0)
+
+        # The stream ends with the move that wins the game
+        self.patch_block(self.first_block, {'is_flagged': False})
+        self.patch_block(self.last_block, {'is_flagged': True})
+        chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 2)
+        self.assertTrue(parse_event(chunks[-1])['data']['has_won'])
+        close_stream(response)
+
+    def test_closing_the_stream_unsubscribes(self):
+        response = self.open_stream(self.game.id)
+        self.assertIn(self.game.id, events.broker.subscribers)
+        close_stream(response)
+        self.assertNotIn(self.game.id, events.broker.subscribers)
+
+    def test_finished_game_stream_ends(self):
+        game = create_game(mines=[5], flipped=[5], has_lost=True)
+        response = self.open_stream(game.id)
+        chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 1)
+        self.assertTrue(parse_event(chunks[0])['data']['has_lost'])
+        close_stream(response)
+
+    def test_broker_can_be_replaced(self):
+        # Moves go to whichever broker is configured
+        stand_in = mock.Mock()
+        with mock.patch.object(events, 'broker', stand_in):
+            self.patch_block(self.first_block, {'is_flipped': True})
+        game_id, event = stand_in.publish.call_args[0]
+        self.assertEqual(game_id, self.game.id)
+        self.assertEqual(event['version'], 1)
+        self.assertEqual(event['revealed'], [[1, 99]])
+
+    def test_move_while_the_stream_opens_is_in_the_state(self):
+        subscribe = events.broker.subscribe
+
+        def subscribe_then_move(game_id):
+            # A move commits just after the stream starts listening
+            subscription = subscribe(game_id)
+            self.patch_block(self.first_block, {'is_flagged': True})
+            return subscription
+
+        with mock.patch.object(events.broker, 'subscribe', side_effect=subscribe_then_move):
+            response = self.open_stream(self.game.id)
+
+        # The state is read after the move, all of it at the new version
+        event = parse_event(next(response.streaming_content))
+        self.assertEqual(event['id'], '1')
+        self.assertTrue(event['data']['blocks'][0]['is_flagged'])
+        self.assertEqual(event['data']['flags_left'], 0)
+        close_stream(response)
+
+    @override_settings(GAMES_EVENT_KEEPALIVE=0.01, GAMES_EVENT_MAX_AGE=0.05)
+    def test_stream_ends_after_its_max_age(self):
+        response = self.open_stream(self.game.id)
+        chunks = list(response.streaming_content)
+        self.assertEqual(parse_event(chunks[0])['event'], 'state')
+        self.assertTrue(all(chunk == b': keepalive\n\n' for chunk in chunks[1:]))
+        close_stream(response)
+
+    def test_unknown_game_stream_does_not_subscribe(self):
+        response = self.open_stream(self.game.id + 1)
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn(self.game.id + 1, events.broker.subscribers)
@@ -0,0 +1,120 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, APIRequestFactory
+from rest_framework.utils import json
+
+from games.views import Games, BlockDetails, GameMoves
+from games.board import Board, convolve_mines
+from games.models import Game, Block
+from games.storage import packed_block_id
+
+
+class LazyMinesTestCase(APITestCase):
+    """
+    This Test Case is for placing the mines of a new game on its first flip
+    """
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def post_game(self, data):
+        # Post a new Game
+        factory = APIRequestFactory()
+        view = Games.as_view()
+        request = factory.post('/games/', data=data, format='json')
+        return Game.objects.get(pk=view(request).data['id'])
+
+    def patch_block(self, block_id, data):
+        # Play a move on a block
+        factory = APIRequestFactory()
+        view = BlockDetails.as_view()
+        request = factory.patch('/games/blocks/' + str(block_id) + '/', data=json.dumps(data),
+                                content_type='application/json')
+        return view(request, block_id=block_id)
+
+    def assert_placed_around(self, game, index):
+        # The mines are placed away from the flipped block and its neighbours, with matching nearby counts
+        game.refresh_from_db()
+        board = Board.load(game)
+        self.assertTrue(game.mines_placed)
+        self.assertEqual(sum(board.mines), game.mine_count)
+        self.assertFalse(any(board.mines[n] for n in [index] + board.neighbours(index)))
+        self.assertEqual(board.nearby, convolve_mines(board.mines, game.width, game.height))
+        self.assertEqual(board.nearby[index], 0)
+        self.assertEqual(game.safe_hidden, len(board) - game.mine_count - sum(board.flipped))
+        return board
+
+    def test_new_game_writes_an_empty_board(self):
+        # One insert for the game and one for its blocks, with nothing to place or count
+        with CaptureQueriesContext(connection) as queries:
+            game = self.post_game({'difficulty': 'beginner'})
+        self.assertEqual(sum(q['sql'].startswith('INSERT') for q in queries), 2)
+        self.assertEqual(game.safe_hidden, 9 * 9)
+        self.assertEqual(Block.objects.filter(game=game, is_mine=True).count(), 0)
+
+    def test_first_flip_places_the_mines(self):
+        game = self.post_game({'difficulty': 'expert'})
+        block = Block.objects.get(game=game, index=45)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch_block(block.pk, {'is_flipped': True})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['has_lost'])
+
+        # One UPDATE for the mines and one per nearby mines count, then the flipped blocks
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "games_block"')]
+        self.assertEqual(sum('"is_mine"' in sql for sql in updates), 1)
+        self.assertLessEqual(len(updates), 1 + 8 + 1)
+
+        # The rows match the board, and the first flip opened a sweep
+        board = self.assert_placed_around(game, 45)
+        self.assertEqual(Block.objects.filter(game=game, is_mine=True).count(), 99)
+        self.assertEqual(sorted(Block.objects.filter(game=game, nearby_mines=0, is_mine=False)
+                                .values_list('index', flat=True)),
+                         [index for index in range(len(board)) if not board.mines[index] and not board.nearby[index]])
+        self.assertGreater(sum(board.flipped), 1)
+
+        # Later flips keep the same mines
+        mines = bytes(board.mines)
+        safe = next(index for index in range(len(board)) if not board.mines[index] and not board.flipped[index])
+        self.patch_block(Block.objects.get(game=game, index=safe).pk, {'is_flipped': True})
+        self.assertEqual(bytes(Board.load(Game.objects.get(pk=game.pk)).mines), mines)
+
+    def test_first_flip_on_a_packed_board(self):
+        game = self.post_game({'width': 200, 'height': 150, 'mines': 4000})
+        self.patch_block(packed_block_id(game.pk, 15000), {'is_flipped': True})
+        self.assert_placed_around(game, 15000)
+
+    def test_flags_before_the_first_flip(self):
+        game = self.post_game({'difficulty': 'beginner'})
+        factory = APIRequestFactory()
+        view = GameMoves.as_view()
+
+        def play(moves):
+            request = factory.post('/games/' + str(game.pk) + '/moves/', data={'moves': moves}, format='json')
+            return view(request, game_id=game.pk)
+
+        # Flags are counted but cannot win before there are mines
+        response = play([{'index': index, 'action': 'flag'} for index in range(10)])
+        self.assertEqual(response.data['flags_left'], 0)
+        self.assertFalse(response.data['has_won'])
+
+        # The flags left standing on mines are counted once the mines are placed
+        self.assertEqual(play([{'index': 80, 'action': 'flip'}]).status_code, 200)
+        board = self.assert_placed_around(game, 80)
+        self.assertEqual({name: getattr(game, name) for name in ('flags_placed', 'mines_flagged', 'safe_hidden')},
+                         board.counters())
+
+    def test_crowded_board_keeps_only_the_flipped_block_safe(self):
+        game = self.post_game({'width': 4, 'height': 4, 'mines': 15})
+        self.patch_block(Block.objects.get(game=game, index=5).pk, {'is_flipped': True})
+
+        game.refresh_from_db()
+        board = Board.load(game)
+        self.assertEqual(sum(board.mines), 15)
+        self.assertFalse(board.mines[5])
+        self.assertEqual(board.nearby[5], 8)
+        self.assertFalse(game.has_lost)
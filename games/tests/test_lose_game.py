@@ -2,6 +2,7 @@ from rest_framework.test import APITestCase, APIRequestFactory
 from rest_framework.utils import json
 
 from games.views import BlockDetails
+from games.board import create_game
 from games.models import Game, Block
 
 
@@ -14,10 +15,8 @@ class LoseGameTestCase(APITestCase):
         """
         In set up, create a game and make the last block a mine
         """
-        self.game = Game.objects.create()
+        self.game = create_game(mines=[99])
         self.last_block = Block.objects.get(game=self.game, index=99)
-        self.last_block.is_mine = True
-        self.last_block.save()
 
     def tearDown(self):
         """
@@ -0,0 +1,86 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, APIRequestFactory
+from rest_framework.utils import json
+
+from games.views import BlockDetails, GameDetails
+from games.board import Board, create_game
+from games.models import Game, Block
+from games.storage import pack_board, unpack_board, packed_block_id
+
+
+class PackedGameTestCase(APITestCase):
+    """
+    This Test Case is for games stored as a single packed row
+    """
+
+    def setUp(self):
+        """
+        In set up, create a packed game and make the last block a mine
+        """
+        self.game = create_game(mines=[99], is_packed=True)
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def patch_block(self, index, data):
+        # Patch a block through its packed id
+        block_id = packed_block_id(self.game.pk, index)
+        url = '/games/blocks/' + str(block_id) + '/'
+        factory = APIRequestFactory()
+        view = BlockDetails.as_view()
+        request = factory.patch(url, data=json.dumps(data), content_type='application/json')
+        return view(request, block_id=str(block_id))
+
+    def test_pack_and_unpack_board(self):
+        board = Board.generate(mines=[0, 5, 99])
+        board.flipped[3] = 1
+        board.flagged[5] = 1
+
+        mines, flipped, flagged, nearby = unpack_board(pack_board(board), 100)
+        self.assertEqual(mines, board.mines)
+        self.assertEqual(flipped, board.flipped)
+        self.assertEqual(flagged, board.flagged)
+        self.assertEqual(nearby, board.nearby)
+
+    def test_packed_game_has_no_block_rows(self):
+        self.assertEqual(Block.objects.count(), 0)
+
+        # Fetch the game with one single row read
+        url = '/games/' + str(self.game.pk) + '/'
+        factory = APIRequestFactory()
+        view = GameDetails.as_view()
+        request = factory.get(url, content_type='application/json')
+        with CaptureQueriesContext(connection) as queries:
+            response = view(request, game_id=self.game.pk)
+        self.assertEqual(len(queries), 1)
+
+        # Assert the blocks are mapped to packed ids
+        blocks = response.data.get('blocks')
+        self.assertEqual(len(blocks), 100)
+        self.assertEqual(blocks[7]['id'], packed_block_id(self.game.pk, 7))
+        self.assertNotIn('is_mine', blocks[99])
+        self.assertEqual(response.data.get('flags_left'), 1)
+
+    def test_flip_packed_block_and_sweep_whole_board(self):
+        response = self.patch_block(0, {'is_flipped': True})
+        self.assertEqual(response.status_code, 200)
+
+        # Everything but the mine is flipped
+        board = Board.load(Game.objects.get(pk=self.game.pk))
+        self.assertEqual(board.flipped.count(1), 99)
+        self.assertFalse(board.flipped[99])
+
+    def test_flag_packed_mine_to_win(self):
+        response = self.patch_block(99, {'is_flagged': True})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data.get('has_won'))
+        self.assertEqual(response.data.get('flags_left'), 0)
+
+    def test_unknown_packed_block_is_not_found(self):
+        response = self.patch_block(100, {'is_flipped': True})
+        self.assertEqual(response.status_code, 404)
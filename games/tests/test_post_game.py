@@ -40,9 +40,11 @@ class GamePostTestCase(APITestCase):
         self.assertEqual(len(Game.objects.all()), 1)
         self.assertEqual(len(Block.objects.all()), NUMBER_OF_BLOCKS)
 
-        # Assert there are NUMBER_OF_MINES mines in the game
+        # Assert the game will have NUMBER_OF_MINES mines, placed on the first flip
         game = Game.objects.first()
-        self.assertEqual(len(Block.objects.filter(game=game, is_mine=True)), NUMBER_OF_MINES)
+        self.assertEqual(game.mine_count, NUMBER_OF_MINES)
+        self.assertFalse(game.mines_placed)
+        self.assertEqual(len(Block.objects.filter(game=game, is_mine=True)), 0)
 
         # Assert the blocks are PRIVATE (i.e. no mine data)
         first_block = response.data.get('blocks')[0]
@@ -0,0 +1,115 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.http import Http404
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIRequestFactory
+
+from games.views import CleanTests, play_moves
+from games.board import Board, create_game
+from games.models import Game, Block
+from games.purge import purge_games, expired_games, delete_game_rows
+
+
+class PurgeGamesTestCase(APITestCase):
+    """
+    This Test Case is for deleting test, finished and abandoned games in batches
+    """
+
+    def setUp(self):
+        """
+        In set up, create five test games and a real one
+        """
+        self.test_games = [create_game(mines=[99], is_test=True) for _ in range(5)]
+        self.game = create_game(mines=[99])
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def age(self, game, **delta):
+        # Make a game look last played some time ago
+        Game.objects.filter(pk=game.pk).update(updated_at=timezone.now() - timedelta(**delta))
+
+    def test_purge_in_batches(self):
+        batches = []
+        with CaptureQueriesContext(connection) as queries:
+            deleted = purge_games(Game.objects.filter(is_test=True), batch_size=2,
+                                  progress=lambda games, blocks, seconds: batches.append((games, blocks)))
+
+        # Three batches, each one select, a locking select and two deletes (plus a savepoint and its release), then
+        # a last empty select, never a SELECT of the blocks
+        self.assertEqual(deleted, (5, 500))
+        self.assertEqual(batches, [(2, 200), (4, 400), (5, 500)])
+        self.assertEqual(len(queries), 6 * 3 + 1)
+        self.assertFalse(any('FROM "games_block"' in q['sql'] and q['sql'].startswith('SELECT') for q in queries))
+
+        # The real game is left alone
+        self.assertEqual(list(Game.objects.values_list('pk', flat=True)), [self.game.pk])
+        self.assertEqual(Block.objects.count(), 100)
+
+    def test_clean_tests(self):
+        factory = APIRequestFactory()
+        view = CleanTests.as_view()
+        response = view(factory.post('/games/clean_tests/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Game.objects.count(), 1)
+        self.assertEqual(Block.objects.count(), 100)
+
+    def test_moves_mark_the_game_played(self):
+        self.age(self.game, days=3)
+        game = Game.objects.get(pk=self.game.pk)
+        board = Board.load(game)
+        board.flip(98)
+        board.save()
+        game.refresh_from_db()
+        self.assertGreater(game.updated_at, timezone.now() - timedelta(minutes=1))
+
+    def test_played_games_are_kept(self):
+        # The game is played after its id was read for the purge, so it is no longer expired and is kept
+        self.age(self.game, days=3)
+        ids = list(expired_games().values_list('pk', flat=True))
+        self.assertEqual(ids, [self.game.pk])
+        play_moves(self.game.pk, [(98, {'is_flipped': True})])
+        self.assertEqual(delete_game_rows(expired_games(), ids), (0, 0))
+        self.assertTrue(Game.objects.filter(pk=self.game.pk).exists())
+        self.assertEqual(Block.objects.filter(game=self.game).count(), 100)
+
+        # A move on a game purged meanwhile is a 404
+        self.age(self.game, days=3)
+        self.assertEqual(delete_game_rows(expired_games(), ids), (1, 100))
+        with self.assertRaises(Http404):
+            play_moves(self.game.pk, [(98, {'is_flipped': True})])
+
+    def test_retention_policy(self):
+        Game.objects.all().delete()
+        old_won = create_game(mines=[99], flagged=[99], has_won=True)
+        old_lost = create_game(mines=[99], flipped=[99], has_lost=True)
+        recent_won = create_game(mines=[99], flagged=[99], has_won=True)
+        idle = create_game(mines=[99])
+        playing = create_game(mines=[99])
+        pooled = create_game(mines=[99], is_pooled=True)
+        self.age(old_won, days=31)
+        self.age(old_lost, days=40)
+        self.age(recent_won, days=2)
+        self.age(idle, hours=73)
+        self.age(playing, hours=2)
+        self.age(pooled, days=100)
+
+        expired = set(expired_games().values_list('pk', flat=True))
+        self.assertEqual(expired, {old_won.pk, old_lost.pk, idle.pk})
+
+        # The command deletes them, with the limits given
+        out = StringIO()
+        call_command('purge_games', '--dry-run', stdout=out)
+        self.assertIn('3 games would be deleted', out.getvalue())
+        call_command('purge_games', '--idle-hours', '1', stdout=out)
+        self.assertIn('Done: 4 games and 400 blocks deleted', out.getvalue())
+        self.assertEqual(set(Game.objects.values_list('pk', flat=True)), {recent_won.pk, pooled.pk})
+        self.assertEqual(Block.objects.count(), 200)
@@ -0,0 +1,130 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, APIRequestFactory
+from rest_framework.utils import json
+
+from games.views import Games, GameDetails, BlockDetails, GameMoves
+from games.board import create_game
+from games.models import Game, Block
+from games.storage import packed_block_id
+
+# Most SQL statements each request may run, for Block row games and packed games (savepoints included)
+MAX_QUERIES = {
+    'get': (2, 1),
+    'flag': (7, 5),
+    'flip': (7, 5),
+    'sweep': (7, 5),
+    'moves': (7, 5),
+    'post': 6,
+    # A flip plus one UPDATE for the mines and one for each nearby mines count from 1 to 8
+    'first_flip': (16, 5),
+}
+
+
+class QueryCountTestCase(APITestCase):
+    """
+    This Test Case is for keeping the number of SQL statements of each request fixed, whatever the board size
+    """
+
+    def setUp(self):
+        """
+        In set up, create a game and a packed game with a mine in the bottom right corner
+        """
+        self.games = [create_game(mines=[99]), create_game(mines=[99], is_packed=True)]
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def block_id(self, game, index):
+        if game.is_packed:
+            return packed_block_id(game.pk, index)
+        return Block.objects.get(game=game, index=index).pk
+
+    def assert_queries(self, name, game, call):
+        # Run a request and check it stayed within its number of statements
+        limit = MAX_QUERIES[name][game.is_packed]
+        with CaptureQueriesContext(connection) as queries:
+            response = call()
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), limit, name + ' ran:\n' + '\n'.join(q['sql'] for q in queries))
+        return response
+
+    def patch_block(self, game, index, data):
+        block_id = self.block_id(game, index)
+        factory = APIRequestFactory()
+        request = factory.patch('/games/blocks/' + str(block_id) + '/', data=json.dumps(data),
+                                content_type='application/json')
+        return lambda: BlockDetails.as_view()(request, block_id=block_id)
+
+    def test_get(self):
+        for game in self.games:
+            factory = APIRequestFactory()
+            request = factory.get('/games/' + str(game.pk) + '/')
+            self.assert_queries('get', game, lambda: GameDetails.as_view()(request, game_id=game.pk))
+
+    def test_flag_and_win(self):
+        for game in self.games:
+            response = self.assert_queries('flag', game, self.patch_block(game, 99, {'is_flagged': True}))
+            self.assertTrue(response.data['has_won'])
+
+            # The running counters match a count of the whole board
+            game.refresh_from_db()
+            self.assertEqual(game.count_blocks(), {'mine_count': 1, 'flags_placed': 1, 'mines_flagged': 1,
+                                                   'safe_hidden': 99})
+
+    def test_flip_without_sweep(self):
+        for game in self.games:
+            self.assert_queries('flip', game, self.patch_block(game, 98, {'is_flipped': True}))
+
+    def test_full_board_sweep(self):
+        for game in self.games:
+            self.assert_queries('sweep', game, self.patch_block(game, 0, {'is_flipped': True}))
+            game.refresh_from_db()
+            self.assertEqual(game.count_blocks()['safe_hidden'], 0)
+
+    def test_first_flip_of_a_new_game(self):
+        # The first flip of a posted game places its mines as well
+        for is_packed in (False, True):
+            factory = APIRequestFactory()
+            request = factory.post('/games/', data={'difficulty': 'expert'}, format='json')
+            with override_settings(GAMES_PACKED_STORAGE=is_packed):
+                game = Game.objects.get(pk=Games.as_view()(request).data['id'])
+            self.assertFalse(game.mines_placed)
+            self.assertEqual(game.is_packed, is_packed)
+            self.assert_queries('first_flip', game, self.patch_block(game, 0, {'is_flipped': True}))
+            game.refresh_from_db()
+            self.assertTrue(game.mines_placed)
+
+    def test_batch_of_moves(self):
+        for game in self.games:
+            moves = [{'index': index, 'action': 'flag'} for index in range(10, 20)]
+            factory = APIRequestFactory()
+            request = factory.post('/games/' + str(game.pk) + '/moves/', data={'moves': moves}, format='json')
+            self.assert_queries('moves', game, lambda: GameMoves.as_view()(request, game_id=game.pk))
+
+    def test_post(self):
+        factory = APIRequestFactory()
+        request = factory.post('/games/', data={'difficulty': 'beginner'}, format='json')
+        with CaptureQueriesContext(connection) as queries:
+            Games.as_view()(request)
+        self.assertLessEqual(len(queries), MAX_QUERIES['post'])
+
+    def test_check_game_counters(self):
+        # Counters that drifted are found with one aggregate query for all row games, and fixed
+        Game.objects.filter(pk=self.games[0].pk).update(flags_placed=3)
+        Game.objects.filter(pk=self.games[1].pk).update(safe_hidden=0)
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('check_game_counters', '--fix', stdout=out)
+        self.assertLessEqual(len(queries), 6)
+        self.assertIn('2 games checked, 2 with wrong counters (fixed)', out.getvalue())
+        self.assertEqual([game.count_blocks() == {name: getattr(game, name) for name in game.count_blocks()}
+                          for game in Game.objects.order_by('pk')], [True, True])
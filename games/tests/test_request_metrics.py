@@ -0,0 +1,75 @@
+from rest_framework.test import APITestCase
+
+from games.board import create_game
+from games.metrics import Metrics, metrics
+from games.models import Game, Block
+
+
+class RequestMetricsTestCase(APITestCase):
+    """
+    This Test Case is for the per view request metrics and their Prometheus export
+    """
+
+    def setUp(self):
+        """
+        In set up, create a game and make the last block a mine
+        """
+        self.game = create_game(mines=[99])
+        self.last_block = Block.objects.get(game=self.game, index=99)
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def test_requests_are_recorded_by_view(self):
+        requests = metrics.value('games_requests_total', view='GameDetails', method='GET', status=200)
+        histogram = metrics.histogram('games_request_queries', view='BlockDetails')
+        flags = histogram.count if histogram else 0
+
+        self.assertEqual(self.client.get('/games/' + str(self.game.id) + '/').status_code, 200)
+        self.client.patch('/games/blocks/' + str(self.last_block.id) + '/', {'is_flagged': True}, format='json')
+
+        # Each request is counted under its view, with its queries and serialization time
+        self.assertEqual(metrics.value('games_requests_total', view='GameDetails', method='GET', status=200),
+                         requests + 1)
+        queries = metrics.histogram('games_request_queries', view='BlockDetails')
+        self.assertEqual(queries.count, flags + 1)
+        self.assertGreater(queries.sum, 0)
+        self.assertGreater(metrics.histogram('games_request_serialize_seconds', view='BlockDetails').sum, 0)
+        self.assertGreater(metrics.value('games_request_query_seconds_total', view='BlockDetails'), 0)
+
+    def test_fixture_views_and_unknown_urls(self):
+        self.client.post('/games/winner/')
+        self.client.get('/nothing/here/')
+        self.assertIsNotNone(metrics.histogram('games_request_seconds', view='WinnerGame'))
+        self.assertGreater(metrics.value('games_requests_total', view='unmatched', method='GET', status=404), 0)
+
+    def test_prometheus_export(self):
+        self.client.get('/games/' + str(self.game.id) + '/')
+        response = self.client.get('/games/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+        text = response.content.decode()
+        self.assertIn('# TYPE games_request_seconds histogram', text)
+        self.assertIn('games_request_seconds_bucket{view="GameDetails",le="+Inf"}', text)
+        self.assertIn('games_requests_total{method="GET",status="200",view="GameDetails"}', text)
+
+    def test_render(self):
+        registry = Metrics()
+        registry.increment('hits_total')
+        registry.observe('size', 3, buckets=(1, 5), view='A')
+        registry.observe('size', 9, buckets=(1, 5), view='A')
+        self.assertEqual(registry.render(), '\n'.join([
+            '# TYPE hits_total counter',
+            'hits_total 1',
+            '# TYPE size histogram',
+            'size_bucket{view="A",le="1"} 0',
+            'size_bucket{view="A",le="5"} 1',
+            'size_bucket{view="A",le="+Inf"} 2',
+            'size_sum{view="A"} 12',
+            'size_count{view="A"} 2',
+        ]) + '\n')
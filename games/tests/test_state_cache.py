@@ -0,0 +1,146 @@
+import time
+
+from django.db import connection
+from django.core.cache import caches
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase, APIRequestFactory
+from rest_framework.utils import json
+
+from games.views import GameDetails, BlockDetails, CacheStats, read_state
+from games.board import Board, create_game
+from games.cache import state_cache
+from games.cache_backends import LocalRedis
+from games.models import Game, Block
+
+# Game state cache backed by the in process Redis stand-in
+LOCAL_REDIS_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'games': {
+        'BACKEND': 'games.cache_backends.RedisCache',
+        'LOCATION': 'redis://local/0',
+        'TIMEOUT': 60,
+        'OPTIONS': {'CLIENT_CLASS': 'games.cache_backends.LocalRedis', 'CLIENT_KWARGS': {'max_keys': 2}},
+    },
+}
+
+
+class StateCacheTestCase(APITestCase):
+    """
+    This Test Case is for the write through game state cache
+    """
+
+    def setUp(self):
+        """
+        In set up, empty the cache, create a game and make the last block a mine
+        """
+        caches['games'].clear()
+        self.game = create_game(mines=[99])
+        self.last_block = Block.objects.get(game=self.game, index=99)
+
+    def tearDown(self):
+        """
+        For tear down, delete all games and blocks
+        """
+        Game.objects.all().delete()
+        Block.objects.all().delete()
+
+    def get_game(self):
+        # Fetch the game
+        url = '/games/' + str(self.game.pk) + '/'
+        factory = APIRequestFactory()
+        view = GameDetails.as_view()
+        request = factory.get(url, content_type='application/json')
+        return view(request, game_id=self.game.pk)
+
+    def flag_last_block(self, url_suffix=''):
+        # Flag the only mine
+        url = '/games/blocks/' + str(self.last_block.pk) + '/' + url_suffix
+        factory = APIRequestFactory()
+        view = BlockDetails.as_view()
+        request = factory.patch(url, data=json.dumps({'is_flagged': True}), content_type='application/json')
+        return view(request, block_id=self.last_block.pk)
+
+    def test_second_fetch_is_served_from_the_cache(self):
+        self.get_game()
+
+        # Only the game row is read on a hit
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_game()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(len(response.data.get('blocks')), 100)
+
+    def test_moves_write_through_the_cache(self):
+        self.get_game()
+        self.flag_last_block()
+
+        # The new version is already cached
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_game()
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(response.data.get('has_won'))
+        self.assertTrue(response.data.get('blocks')[99]['is_flagged'])
+
+    def test_delta_moves_invalidate_the_cache(self):
+        self.get_game()
+        self.flag_last_block(url_suffix='?delta=true')
+
+        # The next fetch is a miss with the new state
+        game = Game.objects.get(pk=self.game.pk)
+        self.assertIsNone(caches['games'].get(state_cache.key(game)))
+        response = self.get_game()
+        self.assertTrue(response.data.get('has_won'))
+
+    def test_blocks_changed_after_the_game_was_read_are_not_cached(self):
+        game = Game.objects.get(pk=self.game.pk)
+
+        # A move commits between reading the game row and its blocks
+        board = Board.load(Game.objects.get(pk=self.game.pk))
+        board.update(99, is_flagged=True)
+        board.save()
+
+        data = read_state(game)
+        self.assertTrue(data.get('blocks')[99]['is_flagged'])
+        self.assertIsNone(caches['games'].get(state_cache.key(game, 0)))
+
+    def test_large_boards_are_not_cached(self):
+        game = create_game(width=200, height=60, is_packed=True)
+        self.assertEqual(read_state(game).get('id'), game.pk)
+        self.assertIsNone(caches['games'].get(state_cache.key(game)))
+
+    def test_stats_count_hits_and_misses(self):
+        before = state_cache.stats()
+        self.get_game()
+        self.get_game()
+
+        # Ask the stats endpoint
+        factory = APIRequestFactory()
+        request = factory.get('/games/cache_stats/')
+        response = CacheStats.as_view()(request)
+        self.assertEqual(response.data['hits'] - before['hits'], 1)
+        self.assertEqual(response.data['misses'] - before['misses'], 1)
+
+    @override_settings(CACHES=LOCAL_REDIS_CACHES)
+    def test_redis_backend_serves_the_state(self):
+        caches['games'].clear()
+        self.get_game()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_game()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.data.get('id'), self.game.pk)
+
+    def test_local_redis_evicts_least_recently_used_and_expired_keys(self):
+        server = LocalRedis(max_keys=2)
+        server.set('a', 1)
+        server.set('b', 2)
+        server.get('a')
+        server.set('c', 3)
+
+        # b was the least recently used
+        self.assertEqual((server.get('a'), server.get('b'), server.get('c')), (1, None, 3))
+
+        # Expired keys are gone
+        server.set('d', 4, ex=0)
+        time.sleep(0.01)
+        self.assertIsNone(server.get('d'))
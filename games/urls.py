@@ -7,6 +7,8 @@ urlpatterns = [
     # (New) Game Data endpoints
     url(r'^$', views.Games.as_view()),
     url(r'^(?P<game_id>[0-9]+)/$', views.GameDetails.as_view()),
+    url(r'^(?P<game_id>[0-9]+)/moves/$', views.GameMoves.as_view()),
+    url(r'^(?P<game_id>[0-9]+)/events/$', views.GameEvents.as_view()),
 
     # Block endpoints
     url(r'^blocks/(?P<block_id>[0-9]+)/$', views.BlockDetails.as_view()),
@@ -16,4 +18,9 @@ urlpatterns = [
     url(r'^winner/$', views.WinnerGame.as_view()),
     url(r'^big_sweep/$', views.BigSweep.as_view()),
     url(r'^clean_tests/$', views.CleanTests.as_view()),
+
+    # Monitoring endpoints
+    url(r'^cache_stats/$', views.CacheStats.as_view()),
+    url(r'^pool_stats/$', views.PoolStats.as_view()),
+    url(r'^metrics/$', views.PrometheusMetrics.as_view()),
 ]
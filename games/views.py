@@ -1,5 +1,8 @@
 # Django specific imports
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.db import OperationalError, transaction
 from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
 
 # Imports for Rest APIs
 from rest_framework.views import APIView
@@ -7,15 +10,138 @@ from rest_framework.response import Response
 from rest_framework import status, permissions
 
 # App/DB specific imports
+from games import events
+from games.cache import state_cache, game_etag
+from games.fixtures import create_fixture_games
+from games.metrics import metrics
 from games.models import Game, Block
-from games.serializers import PrivateBlockSerializer, serialize_blocks
+from games.pool import board_pool, random_game
+from games.purge import purge_games
+from games.serializers import (NewGameSerializer, BlockMoveSerializer, MoveBatchSerializer, FixtureSerializer,
+                               serialize_blocks, serialize_delta)
+from games.storage import split_packed_block_id
 
 # Helper packages
 import random
+import time
+from games.board import Board, StaleBoardError
 from games.sweeper import sweeper
 
 # Constant for number of mines (written only once)
-from games.constants import NUMBER_OF_MINES, NUMBER_OF_BLOCKS
+from games.constants import (MOVE_ACTIONS, MOVE_ATTEMPTS, MOVE_RETRY_DELAY, MAX_ROW_BOARD_BLOCKS, CONTENTION_PGCODES,
+                             CONTENTION_MYSQL_CODES)
+
+
+def get_block_or_404(block_id):
+    """
+    This method finds the game and index of a block, whether it is a Block row or part of a packed game
+    :param block_id: public id of the block
+    :return: (Game obj, index) or throw 404
+    """
+    packed = split_packed_block_id(int(block_id))
+    if packed is None:
+        block = get_object_or_404(Block.objects.select_related('game'), pk=block_id, game__is_pooled=False)
+        return block.game, block.index
+
+    game_id, index = packed
+    game = get_object_or_404(Game, pk=game_id, is_packed=True, is_pooled=False)
+    if index >= game.width * game.height:
+        raise Http404
+    return game, index
+
+
+def wants_delta(request, game):
+    """
+    This method checks if the client asked for only the changes of a move (?delta=true or an X-Board-Delta header),
+    which large boards get unless they ask for the full state (?delta=false)
+    :param request: PATCH or POST
+    :param game: Game obj of the move
+    :return: boolean
+    """
+    value = request.query_params.get('delta') or request.META.get('HTTP_X_BOARD_DELTA', '')
+    if not value:
+        return game.width * game.height > MAX_ROW_BOARD_BLOCKS
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def is_contention(error):
+    """
+    This method checks if a database error only means other transactions got in the way (a busy or locked SQLite
+    database, a serialization failure, deadlock or lock timeout elsewhere), so the move can be tried again
+    :param error: OperationalError
+    :return: boolean
+    """
+    cause = error.__cause__
+    if getattr(cause, 'pgcode', None) in CONTENTION_PGCODES:
+        return True
+    if getattr(cause, 'args', None) and cause.args[0] in CONTENTION_MYSQL_CODES:
+        return True
+    return 'locked' in str(error)
+
+
+def play_moves(game_id, moves):
+    """
+    This method plays moves on a game in one transaction. The game row is locked so moves on a game run one at a
+    time, and the board is only saved if no other move changed the game since it was loaded (retried otherwise)
+    :param game_id: Primary key of the Game obj
+    :param moves: list of (index, changes), changes being the is_flipped and is_flagged of the move
+    :return: (Game obj, Board obj, indexes of the changed blocks, indexes of the swept blocks) or throw 404 if the game
+    was deleted meanwhile
+    """
+    for attempt in range(1, MOVE_ATTEMPTS + 1):
+        try:
+            with transaction.atomic():
+                game = get_object_or_404(Game.objects.select_for_update(), pk=game_id)
+                board = Board.load(game)
+
+                # Play every move on the board in memory
+                fields, revealed = set(), []
+                for index, changes in moves:
+                    move_fields, move_revealed = sweeper.move(board, index, **changes)
+                    fields.update(move_fields)
+                    revealed.extend(move_revealed)
+
+                # Write the board and the result together
+                changed = set(board.changed)
+                board.save(update_fields=fields)
+            return game, board, changed, revealed
+
+        # Another move got in first (or the database is busy), so wait a little and start over
+        except (StaleBoardError, OperationalError) as error:
+            if isinstance(error, OperationalError) and not is_contention(error):
+                raise
+            if attempt == MOVE_ATTEMPTS:
+                raise StaleBoardError('Gave up playing on game ' + str(game_id)) from error
+            time.sleep(random.uniform(0, MOVE_RETRY_DELAY * 2 ** attempt))
+
+
+def write_state(game, board=None):
+    """
+    This method serializes the new state of a game and writes it through to the state cache
+    :param game: Game obj
+    :param board: Board obj of the game, loaded if not given
+    :return: game state - dict
+    """
+    data = serialize_blocks(game, board)
+    state_cache.set(game, data)
+    return data
+
+
+def read_state(game):
+    """
+    This method serves the state of a game from the cache, filling it on a miss
+    :param game: Game obj
+    :return: game state - dict
+    """
+    data = state_cache.get(game)
+    if data is None:
+        # Only cache the blocks if no move came in between reading the game and its blocks
+        board = Board.load(game)
+        if board.loaded_version == game.version:
+            data = write_state(game, board)
+        else:
+            data = serialize_blocks(game, board)
+    return data
 
 
 class Games(APIView):
@@ -23,21 +149,21 @@ class Games(APIView):
 
     def post(self, request, *args, **kwargs):
         """
-        This method will create a new game from scratch
+        This method will create a new game from scratch, 10 by 10 with NUMBER_OF_MINES unless a difficulty or a
+        custom width, height and mines are given
         :param request: POST
-        :return: return 200 for a new game
+        :return: return 200 for a new game, 400 otherwise
         """
-        # Start a new game
-        game = Game.objects.create()
+        serializer = NewGameSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        width, height, mines = (serializer.validated_data[field] for field in ('width', 'height', 'mines'))
 
-        # Make NUMBER_OF_MINES random mines on the board
-        for mine in random.sample(range(1, NUMBER_OF_BLOCKS), NUMBER_OF_MINES):
-            block = Block.objects.get(game=game, index=mine)
-            block.is_mine = True
-            block.save()
+        # Take a ready made board from the pool, or start a new game with random mines on the board
+        game = board_pool.claim(width, height, mines) or random_game(width, height, mines)
 
         # Return the new data in a GameSerializer
-        return Response(serialize_blocks(game), status=status.HTTP_200_OK)
+        return Response(write_state(game), status=status.HTTP_200_OK)
 
 
 class GameDetails(APIView):
@@ -46,15 +172,51 @@ class GameDetails(APIView):
     def get(self, request, game_id):
         """
         This method will find the message with pk == game_id
-        :param request: GET
+        :param request: GET, with If-None-Match to only get the game back if it changed
         :param game_id: Primary Key of the Game obj
-        :return: 200 if pk is found and 404 otherwise
+        :return: 200 if pk is found, 304 if the client has the current version and 404 otherwise
         """
         # Retrieve the game with this Primary Key or throw 404
-        game = get_object_or_404(Game, pk=game_id)
+        game = get_object_or_404(Game, pk=game_id, is_pooled=False)
+        etag = game_etag(game)
+
+        # Nothing changed since the client's copy, so the blocks are not needed
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        # Serve the state from the cache, filling it on a miss
+        data = read_state(game)
 
         # Return the new data in a GameSerializer
-        return Response(serialize_blocks(game), status=status.HTTP_200_OK)
+        return Response(data, status=status.HTTP_200_OK, headers={'ETag': etag})
+
+
+class GameEvents(APIView):
+    permission_classes = (permissions.AllowAny,)
+
+    def get(self, request, game_id):
+        """
+        This method will stream the state of a game and then the changes of every move as Server-Sent Events, so
+        clients do not have to poll the game
+        :param request: GET
+        :param game_id: Primary Key of the Game obj
+        :return: 200 with a text/event-stream until the game is over (or GAMES_EVENT_MAX_AGE), 404 otherwise
+        """
+        # Listen for moves before reading the game, so none is missed in between
+        subscription = events.broker.subscribe(int(game_id))
+        try:
+            game = get_object_or_404(Game, pk=game_id, is_pooled=False)
+            data = read_state(game)
+        except Exception:
+            events.broker.unsubscribe(int(game_id), subscription)
+            raise
+
+        response = StreamingHttpResponse(events.EventStream(game, data, subscription),
+                                         content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
 
 class BlockDetails(APIView):
@@ -63,123 +225,149 @@ class BlockDetails(APIView):
     def patch(self, request, block_id):
         """
         This method will update block data and return the new game state
-        :param request: PATCH
+        :param request: PATCH, with ?delta=true to get only the changed blocks back
         :param block_id: Primary key of the block
-        :return: 200 if block is updated, 400 or 404 otherwise
+        :return: 200 if block is updated, 409 if other moves kept getting in the way, 400 or 404 otherwise
         """
-        block = get_object_or_404(Block, pk=block_id)
-        game = block.game
+        game, index = get_block_or_404(block_id)
 
         # Update the block and return new game state
-        serializer = PrivateBlockSerializer(block, data=request.data, partial=True)
+        serializer = BlockMoveSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
-
-            # If the block is flipped, start the sweep
-            block = get_object_or_404(Block, pk=block_id)
-            if block.is_flipped:
-                sweeper.breadth_first_sweep(block)
+            try:
+                game, board, changed, revealed = play_moves(game.pk, [(index, serializer.validated_data)])
+            except StaleBoardError:
+                return Response({'detail': 'Too many moves at once on this game.'}, status=status.HTTP_409_CONFLICT)
 
-                # Set the game to lost if it's a mine
-                if block.is_mine:
-                    game.has_lost = True
-                    game.save()
+            # Push the changes to the game's event streams
+            delta = serialize_delta(game, board, changed, revealed)
+            events.publish_move(game, delta)
 
-            # If block is flagged, check if the user won
-            if block.is_flagged:
-                game.has_won = True                                       # Start assuming True
-                for b in Block.objects.filter(game=game, is_mine=True):   # Look for one counter example
-                    if not b.is_flagged:                                        # Set to False if found
-                        game.has_won = False
-                game.save()                                               # Save result
-
-            # Return the new game state
-            return Response(serialize_blocks(game), status=status.HTTP_200_OK)
+            # Return only the changes if asked for (the cached state is then dropped), the new game state otherwise
+            if wants_delta(request, game):
+                state_cache.invalidate(game)
+                return Response(delta, status=status.HTTP_200_OK)
+            return Response(write_state(game, board), status=status.HTTP_200_OK)
 
         # If 400 errors, let the user be aware of them
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class BigSweep(APIView):
+class GameMoves(APIView):
     permission_classes = (permissions.AllowAny,)
 
-    def post(self, request, *args, **kwargs):
+    def post(self, request, game_id):
         """
-        This method will create a game with big sweep potential
-        :param request: POST
-        :return: Game data for a big sweep
+        This method will play a batch of moves on one game, in order, and return the new game state
+        :param request: POST with a list of moves, each an index and an action (flip, flag or unflag)
+        :param game_id: Primary Key of the Game obj
+        :return: 200 if every move is played, 409 if other moves kept getting in the way, 400 or 404 otherwise
         """
-        # Create a new test game
-        game = Game.objects.create(is_test=True)
+        game = get_object_or_404(Game, pk=game_id, is_pooled=False)
 
-        # Put a mine in the bottom right corner
-        block = Block.objects.get(game=game, index=99)
-        block.is_mine = True
-        block.save()
+        # Validate every move before playing any of them
+        serializer = MoveBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        moves = serializer.validated_data['moves']
+        if any(move['index'] >= game.width * game.height for move in moves):
+            return Response({'moves': ['Every index must be on the board.']}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Return the new data in a GameSerializer
-        return Response(serialize_blocks(game), status=status.HTTP_200_OK)
+        # Load the board once and play all the moves in a single transaction
+        try:
+            game, board, changed, revealed = play_moves(
+                game.pk, [(move['index'], MOVE_ACTIONS[move['action']]) for move in moves])
+        except StaleBoardError:
+            return Response({'detail': 'Too many moves at once on this game.'}, status=status.HTTP_409_CONFLICT)
 
+        # Push the changes to the game's event streams
+        delta = serialize_delta(game, board, changed, revealed)
+        events.publish_move(game, delta)
 
-class WinnerGame(APIView):
+        # Return only the changes if asked for (the cached state is then dropped), the new game state otherwise
+        if wants_delta(request, game):
+            state_cache.invalidate(game)
+            return Response(delta, status=status.HTTP_200_OK)
+        return Response(write_state(game, board), status=status.HTTP_200_OK)
+
+
+class FixtureGames(APIView):
     permission_classes = (permissions.AllowAny,)
 
+    # Name of the fixture in games.fixtures.FIXTURES
+    fixture = None
+
     def post(self, request, *args, **kwargs):
         """
-        This method will create a return a won game
-        :param request: POST
-        :return: 200 with game data
+        This method will create test games in the final state of the fixture, one unless a count is given
+        :param request: POST, with a count (in the body or the query string) for many games at once
+        :return: 200 with the game data, or a list of games if a count was given, 400 otherwise
         """
-        # Create a new game
-        game = Game.objects.create(is_test=True)
-
-        # Make NUMBER_OF_MINES of Flagged mines on the board
-        for mine in random.sample(range(1, NUMBER_OF_BLOCKS), NUMBER_OF_MINES):
-            block = Block.objects.get(game=game, index=mine)
-            block.is_flipped = False
-            block.is_flagged = True
-            block.is_mine = True
-            block.save()
+        serializer = FixtureSerializer(data=request.data or request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        count = serializer.validated_data.get('count')
 
-        # Set the game as won
-        game.has_won = True
-        game.save()
+        # Create every game with its final board in one bulk write
+        games = create_fixture_games(self.fixture, count or 1)
+        states = [write_state(game, game.initial_board) for game in games]
 
         # Return the new data in a GameSerializer
-        return Response(serialize_blocks(game), status=status.HTTP_200_OK)
+        if count is None:
+            return Response(states[0], status=status.HTTP_200_OK)
+        return Response({'games': states}, status=status.HTTP_200_OK)
+
+
+class BigSweep(FixtureGames):
+    # A game with big sweep potential, a mine in the bottom right corner
+    fixture = 'big_sweep'
+
 
+class WinnerGame(FixtureGames):
+    # A won game with NUMBER_OF_MINES flagged mines
+    fixture = 'winner'
 
-class LoserGame(APIView):
+
+class LoserGame(FixtureGames):
+    # A lost game with NUMBER_OF_MINES flipped mines (except block 99)
+    fixture = 'loser'
+
+
+class CacheStats(APIView):
     permission_classes = (permissions.AllowAny,)
 
-    def post(self, request, *args, **kwargs):
+    def get(self, request, *args, **kwargs):
         """
-        This method will create a return a won game
-        :param request: POST
-        :return: 200 with game data
+        This method will report the hits and misses of the game state cache
+        :param request: GET
+        :return: 200 with the cache stats
         """
-        # Create a new game
-        game = Game.objects.create(is_test=True)
+        return Response(state_cache.stats(), status=status.HTTP_200_OK)
 
-        # Make NUMBER_OF_MINES of mines on the board and flip them
-        for mine in random.sample(range(1, NUMBER_OF_BLOCKS), NUMBER_OF_MINES):
-            block = Block.objects.get(game=game, index=mine)
-            block.is_flipped = True
-            block.is_mine = True
-            block.save()
 
-        # Free block 99 for a hard coded test
-        block = Block.objects.get(game=game, index=99)
-        block.is_flipped = False
-        block.save()
+class PoolStats(APIView):
+    permission_classes = (permissions.AllowAny,)
+
+    def get(self, request, *args, **kwargs):
+        """
+        This method will report the depth of the board pool and how fast boards are claimed from it
+        :param request: GET
+        :return: 200 with the pool stats
+        """
+        return Response(board_pool.stats(), status=status.HTTP_200_OK)
 
-        # Set the game as lost
-        game.has_lost = True
-        game.save()
 
-        # Return the new data in a GameSerializer
-        return Response(serialize_blocks(game), status=status.HTTP_200_OK)
+class PrometheusMetrics(APIView):
+    permission_classes = (permissions.AllowAny,)
+
+    def get(self, request, *args, **kwargs):
+        """
+        This method will export the request, query, cache and pool metrics in the Prometheus text format
+        :param request: GET
+        :return: 200 with the metrics
+        """
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 class CleanTests(APIView):
@@ -191,5 +379,5 @@ class CleanTests(APIView):
         :param request: POST
         :return: 200 with message
         """
-        Game.objects.filter(is_test=True).delete()
+        purge_games(Game.objects.filter(is_test=True))
         return Response({'message': 'Test games deleted!'}, status=status.HTTP_200_OK)
@@ -0,0 +1,17 @@
+"""
+ASGI config for server project.
+
+It exposes the ASGI callable as a module-level variable named ``application``, for servers such as uvicorn or
+daphne (``uvicorn server.asgi:application``). Views run in a pool of ASGI_THREADS threads.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from server.asgi_bridge import WsgiToAsgi
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
+
+application = WsgiToAsgi(get_wsgi_application(), max_workers=settings.ASGI_THREADS)
@@ -0,0 +1,162 @@
+"""
+Serve a WSGI application (Django 2.2 has no ASGI handler of its own) from an ASGI server.
+
+The event loop reads each request and writes each response, so one worker process can hold many clients at once,
+while the blocking Django view and ORM work run in a thread pool executor.
+"""
+
+import asyncio
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def build_environ(scope, body):
+    """
+    This method builds the WSGI environ of an ASGI http request
+    :param scope: ASGI connection scope
+    :param body: request body - bytes
+    :return: WSGI environ - dict
+    """
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+    # Headers become HTTP_ variables, repeated headers are joined
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        value = value.decode('latin1')
+        environ[name] = environ[name] + ',' + value if name in environ else value
+    return environ
+
+
+class WsgiToAsgi:
+    """
+    ASGI application running a WSGI application in a thread pool, streaming its response back chunk by chunk
+    """
+
+    def __init__(self, wsgi_application, max_workers=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError('Only http connections are served, not ' + scope['type'])
+
+        # Read the whole request body
+        body = b''
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+        # Run the view in the pool and send its messages as they come, until the client goes away
+        loop = asyncio.get_event_loop()
+        messages = asyncio.Queue()
+        disconnected = threading.Event()
+
+        def push(message):
+            if disconnected.is_set():
+                return
+            try:
+                loop.call_soon_threadsafe(messages.put_nowait, message)
+            except RuntimeError:
+                pass    # The loop closed as the client went away
+
+        watcher = asyncio.ensure_future(self.wait_for_disconnect(receive, disconnected))
+        future = loop.run_in_executor(self.executor, self.run, build_environ(scope, body), push, disconnected)
+        try:
+            while True:
+                next_message = asyncio.ensure_future(messages.get())
+                await asyncio.wait([next_message, watcher], return_when=asyncio.FIRST_COMPLETED)
+                if not next_message.done():
+                    next_message.cancel()
+                    return
+                message = next_message.result()
+                if message is None:
+                    break
+                await send(message)
+            await future
+
+        # Also when the server cancels the request, so the pool thread stops iterating the response
+        finally:
+            disconnected.set()
+            watcher.cancel()
+
+    @staticmethod
+    async def wait_for_disconnect(receive, disconnected):
+        """
+        This method waits for the client to disconnect once the request body is read
+        :param receive: ASGI receive callable
+        :param disconnected: threading.Event set on disconnect
+        :return: void
+        """
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        disconnected.set()
+
+    def run(self, environ, push, disconnected):
+        """
+        This method calls the WSGI application in a pool thread, closing the response early if the client goes away
+        :param environ: WSGI environ
+        :param push: thread safe callable taking each ASGI message to send (None once done)
+        :param disconnected: threading.Event set once the client is gone
+        :return: void
+        """
+        def start_response(status, headers, exc_info=None):
+            push({
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+            })
+
+        try:
+            result = self.wsgi_application(environ, start_response)
+            try:
+                for chunk in result:
+                    if disconnected.is_set():
+                        return
+                    if chunk:
+                        push({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+            push({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            push(None)
+
+    async def lifespan(self, receive, send):
+        """
+        This method answers the server's startup and shutdown events
+        """
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -27,6 +28,9 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# Is this process running the test suite
+TESTING = sys.argv[1:2] == ['test']
+
 
 # Application definition
 
@@ -45,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its latency covers the other middleware (see GET /games/metrics/)
+    'games.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +65,63 @@ MIDDLEWARE = [
 
 CORS_ORIGIN_ALLOW_ALL = True
 
+# Games
+# Store new games as a single packed row instead of one Block row per block
+GAMES_PACKED_STORAGE = False
+
+# Cache holding the serialized state of games. Least recently used games are dropped past MAX_ENTRIES and
+# abandoned games expire after TIMEOUT seconds. Other backends:
+#   'django.core.cache.backends.filebased.FileBasedCache' with a directory as LOCATION
+#   'games.cache_backends.RedisCache' with a redis:// url as LOCATION (OPTIONS 'CLIENT_CLASS' set to
+#   'games.cache_backends.LocalRedis' gives an in process stand-in)
+GAMES_STATE_CACHE = 'games'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    GAMES_STATE_CACHE: {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'games-state',
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'CULL_FREQUENCY': 10,
+        },
+    },
+}
+
+# Pool of ready made boards new games are claimed from, for each (width, height, mines) configuration. A claim
+# leaving fewer than LOW_WATERMARK boards refills the pool up to HIGH_WATERMARK in a background thread, or
+# run `manage.py refill_board_pool` instead. Off by default: mines are placed on the first flip, so a pooled board
+# is an empty board and claiming one costs as many queries as creating the game. Only worth turning on if
+# creating a game gets more expensive again, e.g. [(10, 10, 15), (9, 9, 10), (16, 16, 40), (30, 16, 99)]
+GAMES_BOARD_POOL = {
+    'CONFIGURATIONS': [],
+    'LOW_WATERMARK': 10,
+    'HIGH_WATERMARK': 50,
+    'REFILL_IN_BACKGROUND': not TESTING,
+}
+
+# How long games are kept by `manage.py purge_games` (run it from cron or another scheduler): finished games for
+# FINISHED_DAYS after their last move, unfinished ones for IDLE_HOURS. Games are deleted BATCH_SIZE at a time
+GAMES_RETENTION = {
+    'FINISHED_DAYS': 30,
+    'IDLE_HOURS': 72,
+    'BATCH_SIZE': 500,
+}
+
+# Broker pushing the moves of a game to its event streams (GET /games/<id>/events/). LocalBroker only reaches
+# streams served by the same process, a broker shared between processes can take its place
+GAMES_EVENT_BROKER = 'games.events.LocalBroker'
+
+# Seconds between keep alive comments on an idle event stream
+GAMES_EVENT_KEEPALIVE = 15
+
+# Seconds an event stream stays open, so streams of abandoned games don't hold a server thread forever (browsers
+# reconnect on their own, and get the current state back first)
+GAMES_EVENT_MAX_AGE = 15 * 60
+
 ROOT_URLCONF = 'server.urls'
 
 TEMPLATES = [
@@ -79,6 +142,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'server.wsgi.application'
 
+# Threads the ASGI application (server/asgi.py) runs views in
+ASGI_THREADS = 32
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -87,6 +153,10 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # A file (not the shared in memory database) so tests can run moves from many threads at once
+        'TEST': {
+            'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3'),
+        },
     }
 }
 